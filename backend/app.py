@@ -1,10 +1,36 @@
-from flask import Flask, request, jsonify
+import click
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from flask_migrate import Migrate
+from werkzeug.exceptions import HTTPException
 from config import Config
 from models import db
+from utils.auth_context import token_scope_allowed
+from utils.pagination import ListQueryError
+from utils.metrics import init_metrics
+from utils.request_logging import configure_logging, logger, request_fields
 import os
+import threading
+
+def start_background_workers(app):
+    """Start the analysis job, email outbox, LLM ledger, research refresh and drive warm-up threads."""
+    from services.analysis_jobs import start_analysis_workers
+    from services.company_research import start_research_refresher
+    from services.drive_warmup import start_drive_warmup_workers
+    from services.email_outbox import start_email_dispatcher
+    from services.llm_ledger import start_ledger_flusher
+    start_analysis_workers(app)
+    start_email_dispatcher(app)
+    start_ledger_flusher(app)
+    start_research_refresher(app)
+    start_drive_warmup_workers(app)
+
+def _serving():
+    # The flask CLI loads the app inside a click context; of its commands only `run` serves
+    context = click.get_current_context(silent=True)
+    return context is None or context.info_name == 'run'
 
 def create_app():
     app = Flask(__name__)
@@ -12,8 +38,10 @@ def create_app():
 
     # Initialize extensions
     db.init_app(app)
-    CORS(app)
-    JWTManager(app)
+    Migrate(app, db, render_as_batch=True)  # batch mode lets SQLite alter tables
+    CORS(app, expose_headers=['X-Next-Cursor'])  # keyset pagination cursor
+    jwt = JWTManager(app)
+    jwt.token_verification_loader(token_scope_allowed)
     Mail(app)
 
     # Create upload folders
@@ -40,42 +68,63 @@ def create_app():
     def health():
         return {'status': 'healthy'}, 200
 
-    # Request lifecycle hooks
-    @app.before_request
-    def log_request_info():
-        print(f"\n=== INCOMING REQUEST ===")
-        print(f"Method: {request.method}")
-        print(f"Path: {request.path}")
-        print(f"Headers: {dict(request.headers)}")
-
-    @app.after_request
-    def log_response_info(response):
-        print(f"\n=== OUTGOING RESPONSE ===")
-        print(f"Status: {response.status}")
-        print(f"Path: {request.path}")
-        if response.status_code == 422:
-            print(f"422 RESPONSE DATA: {response.get_data(as_text=True)}")
-        return response
+    # Structured request logging (JSON lines via a background queue listener)
+    configure_logging(app)
+
+    # Prometheus metrics (request, DB and AI stage latency) served from /metrics
+    if app.config['METRICS_ENABLED']:
+        init_metrics(app)
+
+    @jwt.token_verification_failed_loader
+    def handle_token_scope_error(jwt_header, jwt_data):
+        return jsonify({'error': 'Token not valid for this request'}), 403
 
     # Global error handlers
+    @app.errorhandler(ListQueryError)
+    def handle_list_query_error(e):
+        return jsonify({'error': str(e)}), 400
+
     @app.errorhandler(422)
     def handle_unprocessable_entity(e):
-        print(f"422 ERROR CAUGHT: {str(e)}")
-        print(f"Error description: {e.description if hasattr(e, 'description') else 'No description'}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.warning('Unprocessable entity', extra={'fields': dict(
+            request_fields(), event='error', error=str(e),
+            description=getattr(e, 'description', None)
+        )})
         return jsonify({'error': 'Unprocessable Entity', 'details': str(e)}), 422
 
     @app.errorhandler(Exception)
     def handle_exception(e):
-        print(f"GENERAL EXCEPTION CAUGHT: {type(e).__name__}: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        if isinstance(e, HTTPException):
+            # abort()/get_or_404() keep their status code
+            return jsonify({'error': e.description}), e.code
+        logger.exception(f"Unhandled {type(e).__name__}", extra={'fields': dict(
+            request_fields(), event='error', error=str(e)
+        )})
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Create database tables (schema changes ship as migrations in migrations/)
+    if app.config['DB_AUTO_CREATE']:
+        with app.app_context():
+            db.create_all()
+
+    # Background workers run only when serving, never as a side effect of CLI
+    # commands such as `flask db upgrade`
+    if app.config['BACKGROUND_WORKERS'] and _serving():
+        start_background_workers(app)
+
+    @app.cli.command('run-workers')
+    def run_workers_command():
+        """Run the background workers in this process until interrupted."""
+        start_background_workers(app)
+        print("Background workers running; press Ctrl+C to stop")
+        threading.Event().wait()
+
+    @app.cli.command('drain-outbox')
+    def drain_outbox_command():
+        """Send every due message in the email outbox and exit."""
+        from services.email_outbox import drain_outbox
+        counts = drain_outbox(app)
+        print(f"Sent {counts['sent']}, retrying {counts['retrying']}, failed {counts['failed']}")
 
     return app
 
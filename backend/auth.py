@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models import db, User, Student, HOD, TPO
+from utils.auth_context import auth_claims, load_profile
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -62,16 +63,9 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
 
-    access_token = create_access_token(identity=str(user.id))
-
-    # Get profile data
-    profile = None
-    if user.role == 'student':
-        profile = Student.query.filter_by(user_id=user.id).first()
-    elif user.role == 'hod':
-        profile = HOD.query.filter_by(user_id=user.id).first()
-    elif user.role == 'tpo':
-        profile = TPO.query.filter_by(user_id=user.id).first()
+    # Role and profile travel in the token so requests need not look them up
+    profile = load_profile(user)
+    access_token = create_access_token(identity=str(user.id), additional_claims=auth_claims(user, profile))
 
     return jsonify({
         'access_token': access_token,
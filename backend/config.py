@@ -7,20 +7,77 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://localhost/placement_portal')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Dev convenience; deployments run `flask --app app db upgrade` instead
+    DB_AUTO_CREATE = os.getenv('DB_AUTO_CREATE', 'true').lower() == 'true'
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours
+    JWT_TOKEN_LOCATION = ['headers']  # the analysis stream alone takes a scoped ?jwt= token
+    AUTH_CONTEXT_TTL_SECONDS = int(os.getenv('AUTH_CONTEXT_TTL_SECONDS', 300))
+    AUTH_CONTEXT_CACHE_SIZE = int(os.getenv('AUTH_CONTEXT_CACHE_SIZE', 10000))
 
     # File Upload
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
 
+    # Structured request logging
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))  # share of successful requests logged
+    LOG_SLOW_REQUEST_MS = float(os.getenv('LOG_SLOW_REQUEST_MS', 1000))  # always logged
+    LOG_SKIP_PATHS = [p for p in os.getenv('LOG_SKIP_PATHS', '/health,/metrics').split(',') if p]
+
+    # In-process Prometheus metrics at /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Start the background workers in web processes (false: run `flask --app app run-workers` instead)
+    BACKGROUND_WORKERS = os.getenv('BACKGROUND_WORKERS', 'true').lower() == 'true'
+
     # Email
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
-    MAIL_USE_TLS = True
+    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'  # false for a local SMTP sink
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', os.getenv('MAIL_USERNAME'))
+
+    # Email outbox dispatcher (0 workers: drain with `flask --app app drain-outbox`)
+    EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 1))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100))
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', 5))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+    EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', 30))  # doubled per attempt
+    EMAIL_OUTBOX_STALE_SECONDS = int(os.getenv('EMAIL_OUTBOX_STALE_SECONDS', 600))
 
     # AI - Using OpenAI instead of Anthropic
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+    # LLM call ledger (buffered rows written in batches)
+    LLM_LEDGER_BATCH_SIZE = int(os.getenv('LLM_LEDGER_BATCH_SIZE', 200))
+    LLM_LEDGER_FLUSH_SECONDS = float(os.getenv('LLM_LEDGER_FLUSH_SECONDS', 10))
+    LLM_LEDGER_MAX_BUFFER = int(os.getenv('LLM_LEDGER_MAX_BUFFER', 10000))
+
+    # AI analysis pipeline
+    ANALYSIS_PIPELINE_WORKERS = int(os.getenv('ANALYSIS_PIPELINE_WORKERS', 6))
+    ANALYSIS_RESEARCH_WORKERS = int(os.getenv('ANALYSIS_RESEARCH_WORKERS', 4))  # research stages only
+    ANALYSIS_PIPELINE_TIMEOUT_SECONDS = int(os.getenv('ANALYSIS_PIPELINE_TIMEOUT_SECONDS', 1200))
+    RESUME_INGESTION_WORKERS = int(os.getenv('RESUME_INGESTION_WORKERS', 2))
+    RESUME_INGESTION_WAIT_SECONDS = int(os.getenv('RESUME_INGESTION_WAIT_SECONDS', 120))
+
+    # Background company research refresh (0 workers: stale research is refreshed inline)
+    RESEARCH_REFRESH_WORKERS = int(os.getenv('RESEARCH_REFRESH_WORKERS', 1))
+    RESEARCH_REFRESH_SCAN_SECONDS = float(os.getenv('RESEARCH_REFRESH_SCAN_SECONDS', 1800))
+    RESEARCH_REFRESH_AHEAD_SECONDS = int(os.getenv('RESEARCH_REFRESH_AHEAD_SECONDS', 86400))  # before expiry
+    RESEARCH_REFRESH_BATCH_SIZE = int(os.getenv('RESEARCH_REFRESH_BATCH_SIZE', 20))  # per scan
+
+    # Drive warm-up on create/edit (0 workers: warm-up status 'disabled', drives are analyzed on first use)
+    DRIVE_WARMUP_WORKERS = int(os.getenv('DRIVE_WARMUP_WORKERS', 1))
+    DRIVE_WARMUP_POLL_SECONDS = float(os.getenv('DRIVE_WARMUP_POLL_SECONDS', 5))
+    DRIVE_WARMUP_STALE_SECONDS = int(os.getenv('DRIVE_WARMUP_STALE_SECONDS', 1200))  # > research lease
+
+    # Asynchronous analysis jobs (0 workers disables in-process processing)
+    ANALYSIS_JOB_WORKERS = int(os.getenv('ANALYSIS_JOB_WORKERS', 2))
+    ANALYSIS_JOB_POLL_SECONDS = float(os.getenv('ANALYSIS_JOB_POLL_SECONDS', 2))
+    ANALYSIS_JOB_STALE_SECONDS = int(os.getenv('ANALYSIS_JOB_STALE_SECONDS', 900))
+    ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', 3))
+    ANALYSIS_STREAM_TOKEN_SECONDS = int(os.getenv('ANALYSIS_STREAM_TOKEN_SECONDS', 60))  # to open a stream
+    ANALYSIS_STREAM_MAX_SECONDS = int(os.getenv('ANALYSIS_STREAM_MAX_SECONDS', 60))  # then the client reconnects
@@ -0,0 +1,154 @@
+"""baseline schema
+
+Tables as originally created by db.create_all().
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-18 04:51:59.651244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('companies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('website', sa.String(length=255), nullable=True),
+    sa.Column('industry', sa.String(length=100), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('research_data', sa.JSON(), nullable=True),
+    sa.Column('last_researched', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('hods',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('department', sa.String(length=50), nullable=False),
+    sa.Column('phone', sa.String(length=15), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('placement_drives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=True),
+    sa.Column('job_title', sa.String(length=200), nullable=False),
+    sa.Column('job_description', sa.Text(), nullable=False),
+    sa.Column('job_requirements', sa.JSON(), nullable=True),
+    sa.Column('eligibility_criteria', sa.JSON(), nullable=True),
+    sa.Column('ctc', sa.String(length=50), nullable=True),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.Column('drive_date', sa.DateTime(), nullable=True),
+    sa.Column('registration_deadline', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('students',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('enrollment_no', sa.String(length=50), nullable=False),
+    sa.Column('department', sa.String(length=50), nullable=False),
+    sa.Column('cgpa', sa.Float(), nullable=True),
+    sa.Column('phone', sa.String(length=15), nullable=True),
+    sa.Column('resume_path', sa.String(length=255), nullable=True),
+    sa.Column('skills', sa.JSON(), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('approved_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['approved_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('enrollment_no'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('tpos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=15), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('applications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('drive_id', sa.Integer(), nullable=True),
+    sa.Column('resume_version', sa.String(length=255), nullable=True),
+    sa.Column('cover_letter', sa.Text(), nullable=True),
+    sa.Column('match_score', sa.Float(), nullable=True),
+    sa.Column('ats_score', sa.Float(), nullable=True),
+    sa.Column('skills_gap', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('applied_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['drive_id'], ['placement_drives.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('selection_rounds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('drive_id', sa.Integer(), nullable=True),
+    sa.Column('round_name', sa.String(length=100), nullable=True),
+    sa.Column('round_number', sa.Integer(), nullable=True),
+    sa.Column('round_date', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['drive_id'], ['placement_drives.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('offer_letters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('application_id', sa.Integer(), nullable=True),
+    sa.Column('file_path', sa.String(length=255), nullable=True),
+    sa.Column('issued_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('round_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('application_id', sa.Integer(), nullable=True),
+    sa.Column('round_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('feedback', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ),
+    sa.ForeignKeyConstraint(['round_id'], ['selection_rounds.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('round_results')
+    op.drop_table('offer_letters')
+    op.drop_table('selection_rounds')
+    op.drop_table('applications')
+    op.drop_table('tpos')
+    op.drop_table('students')
+    op.drop_table('placement_drives')
+    op.drop_table('hods')
+    op.drop_table('users')
+    op.drop_table('companies')
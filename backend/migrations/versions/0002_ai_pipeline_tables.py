@@ -0,0 +1,80 @@
+"""ai pipeline tables
+
+Parsed-resume store, resume ingestion and analysis job queues, and the
+precomputed job analysis on placement drives.
+
+Revision ID: 0002_ai_pipeline_tables
+Revises: 0001_baseline
+Create Date: 2026-10-18 04:52:01.715395
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_ai_pipeline_tables'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analysis_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('drive_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('current_stage', sa.String(length=50), nullable=True),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('worker_id', sa.String(length=100), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['drive_id'], ['placement_drives.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('parsed_resumes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('resume_text', sa.Text(), nullable=True),
+    sa.Column('canonical_text', sa.Text(), nullable=True),
+    sa.Column('parsed_data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    op.create_table('resume_ingestions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('resume_path', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('job_analysis', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('job_analysis_version', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('job_analysis_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.drop_column('job_analysis_hash')
+        batch_op.drop_column('job_analysis_version')
+        batch_op.drop_column('job_analysis')
+
+    op.drop_table('resume_ingestions')
+    op.drop_table('parsed_resumes')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,114 @@
+"""index and constraint pack
+
+Secondary indexes for the hot route queries and unique constraints on
+applications(student_id, drive_id) and round_results(application_id, round_id).
+Duplicate round results are collapsed onto the most recently updated row
+(the highest id on ties); duplicate applications have to be resolved by hand
+before upgrading.
+
+Revision ID: 0003_index_constraint_pack
+Revises: 0002_ai_pipeline_tables
+Create Date: 2026-10-18 04:52:03.949323
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_index_constraint_pack'
+down_revision = '0002_ai_pipeline_tables'
+branch_labels = None
+depends_on = None
+
+
+def _remove_duplicate_round_results(bind):
+    # Keep the most recently updated result per (application, round), the
+    # highest id among equal or missing timestamps; earlier rows were
+    # overwritten in the UI anyway.
+    bind.execute(sa.text("""
+        DELETE FROM round_results
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY application_id, round_id
+                    ORDER BY CASE WHEN updated_at IS NULL THEN 1 ELSE 0 END, updated_at DESC, id DESC
+                ) AS position
+                FROM round_results
+            ) ranked
+            WHERE position = 1
+        )
+    """))
+
+
+def _check_duplicate_applications(bind):
+    duplicates = bind.execute(sa.text("""
+        SELECT student_id, drive_id, COUNT(*) FROM applications
+        GROUP BY student_id, drive_id HAVING COUNT(*) > 1
+    """)).fetchall()
+    if duplicates:
+        pairs = ', '.join(f'(student {row[0]}, drive {row[1]})' for row in duplicates[:10])
+        raise RuntimeError(
+            f'{len(duplicates)} student/drive pairs have more than one application, e.g. {pairs}. '
+            'Merge or delete the extra applications before running this migration.'
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _check_duplicate_applications(bind)
+    _remove_duplicate_round_results(bind)
+
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_analysis_jobs_status_created_at', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_analysis_jobs_student_id_drive_id_status', ['student_id', 'drive_id', 'status'], unique=False)
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_drive_id_status', ['drive_id', 'status'], unique=False)
+        batch_op.create_unique_constraint('uq_applications_student_id_drive_id', ['student_id', 'drive_id'])
+
+    with op.batch_alter_table('companies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_companies_name'), ['name'], unique=False)
+
+    with op.batch_alter_table('parsed_resumes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_parsed_resumes_student_id'), ['student_id'], unique=False)
+
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_placement_drives_status'), ['status'], unique=False)
+
+    with op.batch_alter_table('resume_ingestions', schema=None) as batch_op:
+        batch_op.create_index('ix_resume_ingestions_student_id_status', ['student_id', 'status'], unique=False)
+
+    with op.batch_alter_table('round_results', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_round_results_application_id_round_id', ['application_id', 'round_id'])
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.create_index('ix_students_department_is_approved', ['department', 'is_approved'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_index('ix_students_department_is_approved')
+
+    with op.batch_alter_table('round_results', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_round_results_application_id_round_id', type_='unique')
+
+    with op.batch_alter_table('resume_ingestions', schema=None) as batch_op:
+        batch_op.drop_index('ix_resume_ingestions_student_id_status')
+
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_placement_drives_status'))
+
+    with op.batch_alter_table('parsed_resumes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_parsed_resumes_student_id'))
+
+    with op.batch_alter_table('companies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_companies_name'))
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_applications_student_id_drive_id', type_='unique')
+        batch_op.drop_index('ix_applications_drive_id_status')
+
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_analysis_jobs_student_id_drive_id_status')
+        batch_op.drop_index('ix_analysis_jobs_status_created_at')
@@ -0,0 +1,39 @@
+"""email templates
+
+Versioned AI-written email templates per drive and purpose.
+
+Revision ID: 0005_email_templates
+Revises: 0004_email_outbox
+Create Date: 2026-10-18 05:00:02.565887
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_email_templates'
+down_revision = '0004_email_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_templates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('drive_id', sa.Integer(), nullable=True),
+    sa.Column('purpose', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('input_hash', sa.String(length=64), nullable=True),
+    sa.Column('source', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['drive_id'], ['placement_drives.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('drive_id', 'purpose', 'version', name='uq_email_templates_drive_id_purpose_version')
+    )
+
+
+def downgrade():
+    op.drop_table('email_templates')
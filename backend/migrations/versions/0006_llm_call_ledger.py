@@ -0,0 +1,59 @@
+"""llm call ledger
+
+Adds llm_call_ledger: one row per LLM call with model, tokens, cost,
+latency, retries and cache hits, attributed to a stage, user, student and
+drive.
+
+Revision ID: 0006_llm_call_ledger
+Revises: 0005_email_templates
+Create Date: 2026-10-18 05:05:54.986409
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_llm_call_ledger'
+down_revision = '0005_email_templates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_call_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=100), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('total_tokens', sa.Integer(), nullable=True),
+    sa.Column('cost_usd', sa.Float(), nullable=True),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('retries', sa.Integer(), nullable=True),
+    sa.Column('cache_hit', sa.Boolean(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('drive_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('llm_call_ledger', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_llm_call_ledger_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_call_ledger_drive_id'), ['drive_id'], unique=False)
+        batch_op.create_index('ix_llm_call_ledger_stage_created_at', ['stage', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_call_ledger_student_id'), ['student_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_call_ledger_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('llm_call_ledger', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_llm_call_ledger_user_id'))
+        batch_op.drop_index(batch_op.f('ix_llm_call_ledger_student_id'))
+        batch_op.drop_index('ix_llm_call_ledger_stage_created_at')
+        batch_op.drop_index(batch_op.f('ix_llm_call_ledger_drive_id'))
+        batch_op.drop_index(batch_op.f('ix_llm_call_ledger_created_at'))
+
+    op.drop_table('llm_call_ledger')
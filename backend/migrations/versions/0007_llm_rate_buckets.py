@@ -0,0 +1,34 @@
+"""llm rate buckets
+
+Adds llm_rate_buckets: per-model request and token buckets that the LLM
+rate governor shares across worker processes.
+
+Revision ID: 0007_llm_rate_buckets
+Revises: 0006_llm_call_ledger
+Create Date: 2026-10-18 05:07:40.866060
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_llm_rate_buckets'
+down_revision = '0006_llm_call_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_rate_buckets',
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('requests', sa.Float(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('model')
+    )
+
+
+def downgrade():
+    op.drop_table('llm_rate_buckets')
@@ -0,0 +1,36 @@
+"""single flight locks
+
+Adds single_flight_locks: cross-process leases and shared results for
+coalesced operations such as company research.
+
+Revision ID: 0008_single_flight_locks
+Revises: 0007_llm_rate_buckets
+Create Date: 2026-10-18 05:10:38.000132
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_single_flight_locks'
+down_revision = '0007_llm_rate_buckets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('single_flight_locks',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('owner', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('single_flight_locks')
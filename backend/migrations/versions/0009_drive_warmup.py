@@ -0,0 +1,40 @@
+"""drive warm-up
+
+Warm-up state and the precomputed skill vocabulary on placement drives.
+
+Revision ID: 0009_drive_warmup
+Revises: 0008_single_flight_locks
+Create Date: 2026-10-18 05:15:30.216205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_drive_warmup'
+down_revision = '0008_single_flight_locks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('skill_vocabulary', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('warmup_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('warmup_error', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('warmup_requested_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('warmup_started_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('warmed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_placement_drives_warmup_status'), ['warmup_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('placement_drives', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_placement_drives_warmup_status'))
+        batch_op.drop_column('warmed_at')
+        batch_op.drop_column('warmup_started_at')
+        batch_op.drop_column('warmup_requested_at')
+        batch_op.drop_column('warmup_error')
+        batch_op.drop_column('warmup_status')
+        batch_op.drop_column('skill_vocabulary')
@@ -0,0 +1,29 @@
+"""student resume skills
+
+Skills parsed from the student's current resume, kept apart from the skills
+entered by hand so that a new resume replaces the previous resume's skills.
+
+Revision ID: 0010_student_resume_skills
+Revises: 0009_drive_warmup
+Create Date: 2026-10-18 05:41:12.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_student_resume_skills'
+down_revision = '0009_drive_warmup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('resume_skills', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('resume_skills')
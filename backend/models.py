@@ -21,6 +21,9 @@ class User(db.Model):
 
 class Student(db.Model):
     __tablename__ = 'students'
+    __table_args__ = (
+        db.Index('ix_students_department_is_approved', 'department', 'is_approved'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True)
@@ -31,6 +34,7 @@ class Student(db.Model):
     phone = db.Column(db.String(15))
     resume_path = db.Column(db.String(255))
     skills = db.Column(db.JSON)  # Store as JSON array
+    resume_skills = db.Column(db.JSON)  # skills added from the current resume, a subset of skills
     is_approved = db.Column(db.Boolean, default=False)
     approved_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
@@ -38,6 +42,36 @@ class Student(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref='student_profile')
     approver = db.relationship('User', foreign_keys=[approved_by])
 
+class ParsedResume(db.Model):
+    __tablename__ = 'parsed_resumes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of resume bytes
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), index=True)
+    resume_text = db.Column(db.Text)
+    canonical_text = db.Column(db.Text)  # Space-joined ats_engine canonical tokens
+    parsed_data = db.Column(db.JSON)  # Structured AI parse
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+
+    student = db.relationship('Student', backref='parsed_resumes')
+
+class ResumeIngestion(db.Model):
+    __tablename__ = 'resume_ingestions'
+    __table_args__ = (
+        db.Index('ix_resume_ingestions_student_id_status', 'student_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'))
+    resume_path = db.Column(db.String(255))
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+
+    student = db.relationship('Student', backref='resume_ingestions')
+
 class HOD(db.Model):
     __tablename__ = 'hods'
 
@@ -63,7 +97,7 @@ class Company(db.Model):
     __tablename__ = 'companies'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200), nullable=False)
+    name = db.Column(db.String(200), nullable=False, index=True)
     website = db.Column(db.String(255))
     industry = db.Column(db.String(100))
     description = db.Column(db.Text)
@@ -79,12 +113,21 @@ class PlacementDrive(db.Model):
     job_title = db.Column(db.String(200), nullable=False)
     job_description = db.Column(db.Text, nullable=False)
     job_requirements = db.Column(db.JSON)  # Skills, experience, etc.
+    job_analysis = db.Column(db.JSON)  # Precomputed AI analysis of description + requirements
+    job_analysis_version = db.Column(db.Integer, default=0)
+    job_analysis_hash = db.Column(db.String(64))  # Fingerprint of the analyzed inputs
+    skill_vocabulary = db.Column(db.JSON)  # Ranking vocabulary built from the job analysis
+    warmup_status = db.Column(db.String(20), index=True)  # queued, running, ready, failed, disabled
+    warmup_error = db.Column(db.Text)
+    warmup_requested_at = db.Column(db.DateTime)
+    warmup_started_at = db.Column(db.DateTime)
+    warmed_at = db.Column(db.DateTime)
     eligibility_criteria = db.Column(db.JSON)  # CGPA, departments, etc.
     ctc = db.Column(db.String(50))
     location = db.Column(db.String(100))
     drive_date = db.Column(db.DateTime)
     registration_deadline = db.Column(db.DateTime)
-    status = db.Column(db.String(20), default='active')  # active, completed, cancelled
+    status = db.Column(db.String(20), default='active', index=True)  # active, completed, cancelled
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
 
@@ -92,6 +135,10 @@ class PlacementDrive(db.Model):
 
 class Application(db.Model):
     __tablename__ = 'applications'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'drive_id', name='uq_applications_student_id_drive_id'),
+        db.Index('ix_applications_drive_id_status', 'drive_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'))
@@ -107,6 +154,114 @@ class Application(db.Model):
     student = db.relationship('Student', backref='applications')
     drive = db.relationship('PlacementDrive', backref='applications')
 
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_jobs'
+    __table_args__ = (
+        db.Index('ix_analysis_jobs_status_created_at', 'status', 'created_at'),
+        db.Index('ix_analysis_jobs_student_id_drive_id_status', 'student_id', 'drive_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'))
+    drive_id = db.Column(db.Integer, db.ForeignKey('placement_drives.id'))
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    current_stage = db.Column(db.String(50))
+    progress = db.Column(db.JSON)  # {stage: {status, elapsed_ms}}
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    worker_id = db.Column(db.String(100))
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    student = db.relationship('Student', backref='analysis_jobs')
+    drive = db.relationship('PlacementDrive', backref='analysis_jobs')
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+    sent_at = db.Column(db.DateTime)
+
+class EmailTemplate(db.Model):
+    __tablename__ = 'email_templates'
+    __table_args__ = (
+        db.UniqueConstraint('drive_id', 'purpose', 'version', name='uq_email_templates_drive_id_purpose_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    drive_id = db.Column(db.Integer, db.ForeignKey('placement_drives.id'))
+    purpose = db.Column(db.String(50), nullable=False)  # application_confirmation, ...
+    version = db.Column(db.Integer, nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)  # str.format placeholders, e.g. {student_name}
+    input_hash = db.Column(db.String(64))  # Fingerprint of the drive details it was written from
+    source = db.Column(db.String(20), default='ai')
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow())
+
+    drive = db.relationship('PlacementDrive', backref='email_templates')
+
+class LLMCallLedger(db.Model):
+    __tablename__ = 'llm_call_ledger'
+    __table_args__ = (
+        db.Index('ix_llm_call_ledger_stage_created_at', 'stage', 'created_at'),
+    )
+
+    # Plain ids rather than foreign keys: ledger rows outlive deleted students and drives
+    id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(100), nullable=False)
+    model = db.Column(db.String(100))
+    prompt_tokens = db.Column(db.Integer, default=0)
+    completion_tokens = db.Column(db.Integer, default=0)
+    total_tokens = db.Column(db.Integer, default=0)
+    cost_usd = db.Column(db.Float)
+    latency_ms = db.Column(db.Float)
+    retries = db.Column(db.Integer, default=0)
+    cache_hit = db.Column(db.Boolean, default=False)
+    status = db.Column(db.String(20), default='ok')  # ok, error
+    error = db.Column(db.Text)
+    user_id = db.Column(db.Integer, index=True)
+    student_id = db.Column(db.Integer, index=True)
+    drive_id = db.Column(db.Integer, index=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.utcnow(), index=True)
+
+class LLMRateBucket(db.Model):
+    __tablename__ = 'llm_rate_buckets'
+
+    # Token buckets shared by every worker process; see services/rate_governor.py
+    model = db.Column(db.String(100), primary_key=True)
+    requests = db.Column(db.Float, nullable=False)  # Requests available now
+    tokens = db.Column(db.Float, nullable=False)  # LLM tokens available now
+    updated_at = db.Column(db.Float, nullable=False)  # Epoch seconds of the last refill
+    version = db.Column(db.Integer, nullable=False, default=0)  # Optimistic concurrency check
+
+class SingleFlightLock(db.Model):
+    __tablename__ = 'single_flight_locks'
+
+    # One row per coalesced operation; see services/single_flight.py
+    key = db.Column(db.String(255), primary_key=True)
+    owner = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False)  # running, done, failed
+    result = db.Column(db.JSON)  # Shared with callers that waited on the flight
+    expires_at = db.Column(db.DateTime)  # Lease end; an expired running flight can be taken over
+    finished_at = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Optimistic concurrency check
+
 class SelectionRound(db.Model):
     __tablename__ = 'selection_rounds'
 
@@ -121,6 +276,9 @@ class SelectionRound(db.Model):
 
 class RoundResult(db.Model):
     __tablename__ = 'round_results'
+    __table_args__ = (
+        db.UniqueConstraint('application_id', 'round_id', name='uq_round_results_application_id_round_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     application_id = db.Column(db.Integer, db.ForeignKey('applications.id'))
@@ -1,21 +1,21 @@
 import json
 import os
+import time
 
-import openai
-from flask import Blueprint, jsonify, request, send_file
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Application, Company, PlacementDrive, Student, db
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
+from flask_jwt_extended import jwt_required
+from models import AnalysisJob, Application, Company, PlacementDrive, db
 from utils.decorators import role_required
-from services.company_research import analyze_job_requirements, research_company
-from services.resume_service import (
-    extract_resume_text,
-    parse_resume_with_ai,
-    calculate_match_score,
-    calculate_ats_score,
-    identify_skills_gap,
-    prepare_personalized_resume,
-    get_personalized_resume_path,
-)
+from utils.auth_context import create_stream_token, current_profile_id, current_student
+from services.company_research import research_company
+from services.analysis_pipeline import PipelineError, run_job_fit_analysis
+from services.analysis_jobs import FINISHED_STATUSES, enqueue_analysis_job, serialize_job
+from services.email_outbox import queue_email
+from services.email_templates import render_email
+from services.resume_ingestion import wait_for_resume_ingestion
+from services.resume_store import load_parsed_resume
+from services.resume_service import get_personalized_resume_path
+from services.openai_client import create_chat_completion
 
 ai_bp = Blueprint('ai', __name__)
 
@@ -33,89 +33,122 @@ def _safe_download_token(value):
 @role_required(['student'])
 def analyze_job_fit(drive_id):
     """Comprehensive AI analysis of job fit"""
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
     drive = PlacementDrive.query.get_or_404(drive_id)
 
-    # Check if student has resume
-    if not student.resume_path:
-        return jsonify({'error': 'Please upload resume first'}), 400
+    # Independent stages (research, job analysis, ATS, skills gap) run concurrently
+    try:
+        analysis = run_job_fit_analysis(
+            student,
+            drive,
+            explain_ats=request.args.get('explain_ats', '').lower() in ('1', 'true')
+        )
+    except PipelineError as e:
+        return jsonify({'error': e.message}), e.status_code
 
-    # Extract resume text
-    resume_text = extract_resume_text(student.resume_path)
-    if not resume_text:
-        return jsonify({'error': 'Could not read resume'}), 500
+    return jsonify(analysis), 200
 
-    # Parse resume with AI
-    parsed_resume = parse_resume_with_ai(resume_text)
-    if not parsed_resume:
-        return jsonify({'error': 'Could not parse resume'}), 500
-
-    # Research company & role using deep research
-    company_data = research_company(
-        drive.company.name,
-        drive.company.website,
-        job_title=drive.job_title,
-        job_description=drive.job_description,
-        student_profile={
-            "summary": parsed_resume.get("summary"),
-            "skills": parsed_resume.get("skills"),
-            "experience": parsed_resume.get("experience"),
-            "projects": parsed_resume.get("projects"),
-        },
-    )
+@ai_bp.route('/analyze-job/<int:drive_id>/jobs', methods=['POST'])
+@jwt_required()
+@role_required(['student'])
+def submit_analysis_job(drive_id):
+    """Queue a job-fit analysis and return its id immediately"""
+    student = current_student()
+    drive = PlacementDrive.query.get_or_404(drive_id)
 
-    # Analyze job requirements
-    job_analysis = analyze_job_requirements(
-        drive.job_description,
-        drive.job_requirements or {}
-    )
+    if not student.resume_path:
+        return jsonify({'error': 'Please upload resume first'}), 400
 
-    # Calculate match score
-    match_analysis = calculate_match_score(parsed_resume, job_analysis, company_data)
+    job = enqueue_analysis_job(student, drive)
 
-    # Calculate ATS score
-    all_keywords = (job_analysis.get('required_skills', []) +
-                   job_analysis.get('preferred_skills', []) +
-                   job_analysis.get('must_have_keywords', []))
-    ats_analysis = calculate_ats_score(resume_text, all_keywords)
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'poll_url': f"/api/ai/analysis-jobs/{job.id}",
+        'stream_token_url': f"/api/ai/analysis-jobs/{job.id}/stream-token"
+    }), 202
 
-    # Skills gap analysis
-    skills_gap = identify_skills_gap(
-        parsed_resume.get('skills', []),
-        job_analysis.get('required_skills', []),
-        job_analysis.get('preferred_skills', [])
-    )
+def _get_student_job(job_id):
+    return AnalysisJob.query.filter_by(id=job_id, student_id=current_profile_id()).first_or_404()
 
-    # Generate personalized resume package (content + PDF)
-    personalized_content, personalized_pdf_path = prepare_personalized_resume(
-        student,
-        drive,
-        parsed_resume,
-        job_analysis,
-        company_data,
-        match_analysis,
-        skills_gap,
-    )
+@ai_bp.route('/analysis-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@role_required(['student'])
+def get_analysis_job(job_id):
+    """Poll an analysis job for progress and, once finished, its result"""
+    job = _get_student_job(job_id)
+    return jsonify(serialize_job(job)), 200
 
+@ai_bp.route('/analysis-jobs/<int:job_id>/stream-token', methods=['POST'])
+@jwt_required()
+@role_required(['student'])
+def get_analysis_stream_token(job_id):
+    """Short-lived token for the job's SSE stream (EventSource cannot send headers)"""
+    job = _get_student_job(job_id)
+    token = create_stream_token(job.id)
     return jsonify({
-        'company_research': company_data,
-        'job_analysis': job_analysis,
-        'match_analysis': match_analysis,
-        'ats_analysis': ats_analysis,
-        'skills_gap': skills_gap,
-        'personalized_content': personalized_content,
-        'personalized_resume_pdf': personalized_pdf_path.replace('\\', '/') if personalized_pdf_path else None,
-        'parsed_resume': parsed_resume
+        'stream_url': f"/api/ai/analysis-jobs/{job.id}/stream?jwt={token}",
+        'expires_in': current_app.config['ANALYSIS_STREAM_TOKEN_SECONDS']
     }), 200
 
+@ai_bp.route('/analysis-jobs/<int:job_id>/stream', methods=['GET'])
+@jwt_required(locations=['query_string'])
+@role_required(['student'], locations=['query_string'])
+def stream_analysis_job(job_id):
+    """
+    Server-sent events with stage-by-stage progress and the final result.
+
+    Each stream holds a sync worker, so it closes after
+    ANALYSIS_STREAM_MAX_SECONDS with a 'reconnect' event; the client then
+    opens a new stream (with a new stream token) or polls poll_url.
+    """
+    job = _get_student_job(job_id)
+    job_id = job.id
+    max_seconds = current_app.config['ANALYSIS_STREAM_MAX_SECONDS']
+
+    def events():
+        last_payload = None
+        last_sent = time.monotonic()
+        deadline = last_sent + max_seconds
+        while True:
+            db.session.expire_all()
+            job = db.session.get(AnalysisJob, job_id)
+            finished = job.status in FINISHED_STATUSES
+            payload = json.dumps(serialize_job(job, include_result=finished))
+
+            if payload != last_payload:
+                event = 'done' if finished else 'progress'
+                yield f"event: {event}\ndata: {payload}\n\n"
+                last_payload = payload
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+            if finished:
+                return
+            if time.monotonic() >= deadline:
+                payload = json.dumps({
+                    'job_id': job_id,
+                    'poll_url': f"/api/ai/analysis-jobs/{job_id}",
+                    'stream_token_url': f"/api/ai/analysis-jobs/{job_id}/stream-token"
+                })
+                yield f"event: reconnect\ndata: {payload}\n\n"
+                return
+            time.sleep(1)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @ai_bp.route('/apply/<int:drive_id>', methods=['POST'])
 @jwt_required()
 @role_required(['student'])
 def apply_to_drive(drive_id):
     """Apply to drive with AI-enhanced application"""
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
     drive = PlacementDrive.query.get_or_404(drive_id)
 
     # Check if already applied
@@ -137,6 +170,10 @@ def apply_to_drive(drive_id):
         personalized_resume_path if os.path.exists(personalized_resume_path) else student.resume_path
     )
 
+    # Confirmation email rendered from the drive's cached template (may store a
+    # newly generated template, so it runs before the application is added)
+    subject, body = render_email(drive, 'application_confirmation', student)
+
     # Create application
     application = Application(
         student_id=student.id,
@@ -147,24 +184,10 @@ def apply_to_drive(drive_id):
         skills_gap=data.get('skills_gap'),
         status='applied'
     )
-
     db.session.add(application)
-    db.session.commit()
-
-    # Send confirmation email (AI-generated)
-    from services.email_service import generate_ai_email, send_email_notification
+    queue_email(to=student.user.email, subject=subject, body=body)
 
-    email_body = generate_ai_email(
-        context=f"Student {student.name} applied to {drive.job_title} at {drive.company.name}",
-        purpose="Application confirmation email"
-    )
-
-    if email_body:
-        send_email_notification(
-            to=student.user.email,
-            subject=f"Application Submitted - {drive.job_title}",
-            body=email_body
-        )
+    db.session.commit()
 
     return jsonify({
         'message': 'Application submitted successfully',
@@ -187,15 +210,17 @@ def get_company_research(company_id):
 @role_required(['student'])
 def generate_cover_letter(drive_id):
     """Generate personalized cover letter"""
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
     drive = PlacementDrive.query.get_or_404(drive_id)
 
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    if not student.resume_path:
+        return jsonify({'error': 'Please upload resume first'}), 400
 
-    # Get student resume
-    resume_text = extract_resume_text(student.resume_path)
-    parsed_resume = parse_resume_with_ai(resume_text)
+    # Get student resume (served from the parsed-resume store when unchanged)
+    wait_for_resume_ingestion(student.id)
+    resume_text, parsed_resume = load_parsed_resume(student.id, student.resume_path)
+    if not parsed_resume:
+        return jsonify({'error': 'Could not parse resume'}), 500
 
     # Get company research
     company_data = research_company(drive.company.name, drive.company.website)
@@ -224,7 +249,8 @@ Write a compelling, personalized cover letter that:
 5. Has a professional tone"""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "generate_cover_letter",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a professional cover letter writer helping college students apply for jobs."},
@@ -240,7 +266,7 @@ Write a compelling, personalized cover letter that:
             'cover_letter': cover_letter
         }), 200
 
-    except Exception as e:
+    except Exception:
         return jsonify({'error': 'Could not generate cover letter'}), 500
 
 @ai_bp.route('/personalized-resume/<int:drive_id>', methods=['GET'])
@@ -248,8 +274,7 @@ Write a compelling, personalized cover letter that:
 @role_required(['student'])
 def download_personalized_resume(drive_id):
     """Allow student to download the AI-personalized resume PDF."""
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
     drive = PlacementDrive.query.get_or_404(drive_id)
 
     file_path = get_personalized_resume_path(student, drive)
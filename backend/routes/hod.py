@@ -1,24 +1,49 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Student, HOD, Application
+from models import db, Student, Application, PlacementDrive
 from utils.decorators import role_required
-from services.email_service import send_email_notification
+from utils.auth_context import get_auth_context
+from services.email_outbox import queue_email
+from utils.pagination import apply_filters, paginate, paginated_response
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
 
 hod_bp = Blueprint('hod', __name__)
 
+PENDING_STUDENT_SORTS = {
+    'enrollment_no': [(Student.enrollment_no, 'asc')],
+    'cgpa': [(func.coalesce(Student.cgpa, -1.0), 'desc'), (Student.id, 'asc')],
+    'oldest': [(Student.id, 'asc')],
+}
+PENDING_STUDENT_FILTERS = {
+    'min_cgpa': (Student.cgpa, 'gte'),
+    'max_cgpa': (Student.cgpa, 'lte'),
+}
+
+PLACEMENT_REPORT_SORTS = {
+    'newest': [(Application.applied_at, 'desc'), (Application.id, 'desc')],
+    'enrollment_no': [(Student.enrollment_no, 'asc'), (Application.id, 'asc')],
+}
+PLACEMENT_REPORT_FILTERS = {
+    'min_cgpa': (Student.cgpa, 'gte'),
+    'max_cgpa': (Student.cgpa, 'lte'),
+    'min_match_score': (Application.match_score, 'gte'),
+}
+
 @hod_bp.route('/students/pending', methods=['GET'])
 @jwt_required()
 @role_required(['hod'])
 def get_pending_students():
-    user_id = int(get_jwt_identity())
-    hod = HOD.query.filter_by(user_id=user_id).first()
+    hod = get_auth_context()  # department comes from the token
 
-    students = Student.query.filter_by(
+    query = Student.query.options(joinedload(Student.user)).filter_by(
         department=hod.department,
         is_approved=False
-    ).all()
+    )
+    query = apply_filters(query, request.args, PENDING_STUDENT_FILTERS)
+    students, next_cursor = paginate(query, request.args, PENDING_STUDENT_SORTS, 'enrollment_no')
 
-    return jsonify([{
+    return paginated_response([{
         'id': s.id,
         'name': s.name,
         'enrollment_no': s.enrollment_no,
@@ -27,7 +52,7 @@ def get_pending_students():
         'phone': s.phone,
         'resume_path': s.resume_path,
         'skills': s.skills
-    } for s in students]), 200
+    } for s in students], next_cursor), 200
 
 @hod_bp.route('/students/<int:student_id>/approve', methods=['POST'])
 @jwt_required()
@@ -39,15 +64,15 @@ def approve_student(student_id):
     student.is_approved = True
     student.approved_by = user_id
 
-    db.session.commit()
-
-    # Send approval email
-    send_email_notification(
+    # Approval email, committed with the approval
+    queue_email(
         to=student.user.email,
         subject="Profile Approved",
-        body=f"Your profile has been approved by the HOD. You can now apply for placements."
+        body="Your profile has been approved by the HOD. You can now apply for placements."
     )
 
+    db.session.commit()
+
     return jsonify({'message': 'Student approved'}), 200
 
 @hod_bp.route('/students/<int:student_id>', methods=['PUT'])
@@ -75,8 +100,7 @@ def update_student(student_id):
 @jwt_required()
 @role_required(['hod'])
 def get_department_stats():
-    user_id = int(get_jwt_identity())
-    hod = HOD.query.filter_by(user_id=user_id).first()
+    hod = get_auth_context()  # department comes from the token
 
     total_students = Student.query.filter_by(department=hod.department).count()
     approved_students = Student.query.filter_by(department=hod.department, is_approved=True).count()
@@ -99,14 +123,23 @@ def get_department_stats():
 @jwt_required()
 @role_required(['hod'])
 def get_placement_report():
-    user_id = int(get_jwt_identity())
-    hod = HOD.query.filter_by(user_id=user_id).first()
+    hod = get_auth_context()  # department comes from the token
 
     # Get all placed students in department
-    placed_apps = db.session.query(Application).join(Student).filter(
-        Student.department == hod.department,
-        Application.status == 'selected'
-    ).all()
+    query = (
+        db.session.query(Application)
+        .join(Application.student)
+        .options(
+            contains_eager(Application.student),
+            joinedload(Application.drive).joinedload(PlacementDrive.company)
+        )
+        .filter(
+            Student.department == hod.department,
+            Application.status == 'selected'
+        )
+    )
+    query = apply_filters(query, request.args, PLACEMENT_REPORT_FILTERS)
+    placed_apps, next_cursor = paginate(query, request.args, PLACEMENT_REPORT_SORTS, 'newest')
 
     report = []
     for app in placed_apps:
@@ -119,4 +152,4 @@ def get_placement_report():
             'selected_date': app.applied_at.isoformat()
         })
 
-    return jsonify(report), 200
+    return paginated_response(report, next_cursor), 200
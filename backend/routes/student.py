@@ -1,18 +1,33 @@
 from flask import Blueprint, request, jsonify, send_file
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Student, User, PlacementDrive, Application, OfferLetter
+from flask_jwt_extended import jwt_required
+from models import db, Student, User, PlacementDrive, Application, OfferLetter, ResumeIngestion
 from utils.decorators import role_required
+from utils.auth_context import current_profile_id, current_student
+from services.eligibility import compile_eligibility, not_applied_by
+from services.resume_ingestion import enqueue_resume_ingestion
+from services.resume_store import invalidate_parsed_resumes
+from utils.pagination import apply_filters, paginate, paginated_response
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
 from werkzeug.utils import secure_filename
 import os
 
 student_bp = Blueprint('student', __name__)
 
+MY_APPLICATION_SORTS = {
+    'newest': [(Application.applied_at, 'desc'), (Application.id, 'desc')],
+    'match_score': [(func.coalesce(Application.match_score, -1.0), 'desc'), (Application.id, 'desc')],
+}
+MY_APPLICATION_FILTERS = {
+    'status': (Application.status, 'in'),
+    'min_match_score': (Application.match_score, 'gte'),
+}
+
 @student_bp.route('/profile', methods=['GET'])
 @jwt_required()
 @role_required(['student'])
 def get_profile():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
 
     return jsonify({
         'id': student.id,
@@ -31,8 +46,7 @@ def get_profile():
 @jwt_required()
 @role_required(['student'])
 def update_profile():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
     data = request.get_json()
 
     if 'name' in data:
@@ -52,8 +66,7 @@ def update_profile():
 @jwt_required()
 @role_required(['student'])
 def upload_resume():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
+    student = current_student()
 
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
@@ -69,52 +82,65 @@ def upload_resume():
     file.save(filepath)
 
     student.resume_path = filepath
+    invalidate_parsed_resumes(student.id)
     db.session.commit()
 
+    # Extract and parse in the background so job analysis never pays for it inline
+    ingestion = enqueue_resume_ingestion(student)
+
     return jsonify({
         'message': 'Resume uploaded',
-        'resume_path': filepath
+        'resume_path': filepath,
+        'ingestion_id': ingestion.id
+    }), 200
+
+@student_bp.route('/resume/ingestions/<int:ingestion_id>', methods=['GET'])
+@jwt_required()
+@role_required(['student'])
+def get_resume_ingestion(ingestion_id):
+    student_id = current_profile_id()
+    ingestion = ResumeIngestion.query.filter_by(id=ingestion_id, student_id=student_id).first_or_404()
+    student = db.session.get(Student, student_id)
+
+    return jsonify({
+        'id': ingestion.id,
+        'status': ingestion.status,
+        'error': ingestion.error,
+        'resume_path': ingestion.resume_path,
+        'skills': student.skills if ingestion.status == 'completed' else None,
+        'created_at': ingestion.created_at.isoformat(),
+        'started_at': ingestion.started_at.isoformat() if ingestion.started_at else None,
+        'completed_at': ingestion.completed_at.isoformat() if ingestion.completed_at else None
     }), 200
 
 @student_bp.route('/drives/available', methods=['GET'])
 @jwt_required()
 @role_required(['student'])
 def get_available_drives():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
-
-    # Get drives student is eligible for and hasn't applied to
-    drives = PlacementDrive.query.filter_by(status='active').all()
-
-    available_drives = []
-    for drive in drives:
-        # Check if already applied
-        existing_app = Application.query.filter_by(
-            student_id=student.id,
-            drive_id=drive.id
-        ).first()
-
-        if not existing_app:
-            # Check eligibility
-            criteria = drive.eligibility_criteria or {}
-            eligible = True
-
-            if 'min_cgpa' in criteria and student.cgpa < criteria['min_cgpa']:
-                eligible = False
-
-            if 'departments' in criteria and student.department not in criteria['departments']:
-                eligible = False
-
-            if eligible:
-                available_drives.append({
-                    'id': drive.id,
-                    'company_name': drive.company.name,
-                    'job_title': drive.job_title,
-                    'ctc': drive.ctc,
-                    'location': drive.location,
-                    'drive_date': drive.drive_date.isoformat() if drive.drive_date else None,
-                    'registration_deadline': drive.registration_deadline.isoformat() if drive.registration_deadline else None
-                })
+    student = current_student()
+
+    # Eligible drives the student hasn't applied to, in a single query
+    drives = (
+        PlacementDrive.query
+        .outerjoin(PlacementDrive.company)
+        .options(contains_eager(PlacementDrive.company))
+        .filter(
+            PlacementDrive.status == 'active',
+            compile_eligibility(student),
+            not_applied_by(student)
+        )
+        .all()
+    )
+
+    available_drives = [{
+        'id': drive.id,
+        'company_name': drive.company.name if drive.company else None,
+        'job_title': drive.job_title,
+        'ctc': drive.ctc,
+        'location': drive.location,
+        'drive_date': drive.drive_date.isoformat() if drive.drive_date else None,
+        'registration_deadline': drive.registration_deadline.isoformat() if drive.registration_deadline else None
+    } for drive in drives]
 
     return jsonify(available_drives), 200
 
@@ -122,12 +148,15 @@ def get_available_drives():
 @jwt_required()
 @role_required(['student'])
 def get_my_applications():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
-
-    applications = Application.query.filter_by(student_id=student.id).all()
-
-    return jsonify([{
+    query = (
+        Application.query
+        .options(joinedload(Application.drive).joinedload(PlacementDrive.company))
+        .filter(Application.student_id == current_profile_id())
+    )
+    query = apply_filters(query, request.args, MY_APPLICATION_FILTERS)
+    applications, next_cursor = paginate(query, request.args, MY_APPLICATION_SORTS, 'newest')
+
+    return paginated_response([{
         'id': app.id,
         'company_name': app.drive.company.name,
         'job_title': app.drive.job_title,
@@ -135,16 +164,13 @@ def get_my_applications():
         'match_score': app.match_score,
         'ats_score': app.ats_score,
         'applied_at': app.applied_at.isoformat()
-    } for app in applications]), 200
+    } for app in applications], next_cursor), 200
 
 @student_bp.route('/applications/<int:app_id>/offer-letter', methods=['GET'])
 @jwt_required()
 @role_required(['student'])
 def download_offer_letter(app_id):
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first_or_404()
-
-    application = Application.query.filter_by(id=app_id, student_id=student.id).first_or_404()
+    application = Application.query.filter_by(id=app_id, student_id=current_profile_id()).first_or_404()
     offer = OfferLetter.query.filter_by(application_id=app_id).first_or_404()
 
     return send_file(offer.file_path, as_attachment=True)
@@ -1,13 +1,54 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, PlacementDrive, Company, Application, SelectionRound, RoundResult, OfferLetter
+from models import db, PlacementDrive, Company, Application, Student, SelectionRound, OfferLetter
 from utils.decorators import role_required
-from services.email_service import send_email_notification
-from datetime import datetime
+from services.email_outbox import queue_email, queue_emails
+from services.company_research import ensure_drive_job_analysis
+from services.drive_warmup import enqueue_drive_warmup, serialize_warmup
+from services.applicant_ranking import rank_applicants
+from services.round_results import RoundResultsError, parse_results_csv, upsert_round_results
+from services.llm_ledger import REPORT_GROUPS, usage_report
+from utils.pagination import ListQueryError, apply_filters, paginate, paginated_response
+from sqlalchemy import case, func
+from sqlalchemy.orm import contains_eager, joinedload
+from datetime import datetime, timedelta
 import os
 
 tpo_bp = Blueprint('tpo', __name__)
 
+APPLICATION_STATUSES = ['applied', 'shortlisted', 'rejected', 'selected']
+
+COMPANY_SORTS = {
+    'name': [(Company.name, 'asc'), (Company.id, 'asc')],
+    'id': [(Company.id, 'asc')],
+}
+COMPANY_FILTERS = {
+    'industry': (Company.industry, 'eq'),
+}
+
+DRIVE_SORTS = {
+    'id': [(PlacementDrive.id, 'asc')],
+    'newest': [(PlacementDrive.id, 'desc')],
+}
+DRIVE_FILTERS = {
+    'status': (PlacementDrive.status, 'in'),
+    'company_id': (PlacementDrive.company_id, 'eq'),
+}
+
+DRIVE_APPLICATION_SORTS = {
+    'applied_at': [(Application.applied_at, 'asc'), (Application.id, 'asc')],
+    'match_score': [(func.coalesce(Application.match_score, -1.0), 'desc'), (Application.id, 'asc')],
+    'ats_score': [(func.coalesce(Application.ats_score, -1.0), 'desc'), (Application.id, 'asc')],
+    'cgpa': [(func.coalesce(Student.cgpa, -1.0), 'desc'), (Application.id, 'asc')],
+}
+DRIVE_APPLICATION_FILTERS = {
+    'status': (Application.status, 'in'),
+    'department': (Student.department, 'in'),
+    'min_cgpa': (Student.cgpa, 'gte'),
+    'max_cgpa': (Student.cgpa, 'lte'),
+    'min_match_score': (Application.match_score, 'gte'),
+}
+
 @tpo_bp.route('/test', methods=['GET'])
 @jwt_required()
 def test_endpoint():
@@ -46,14 +87,17 @@ def create_company():
 @jwt_required()
 def get_companies():
     try:
-        companies = Company.query.all()
+        query = apply_filters(Company.query, request.args, COMPANY_FILTERS)
+        companies, next_cursor = paginate(query, request.args, COMPANY_SORTS, 'name')
 
-        return jsonify([{
+        return paginated_response([{
             'id': c.id,
             'name': c.name,
             'website': c.website,
             'industry': c.industry
-        } for c in companies]), 200
+        } for c in companies], next_cursor), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error getting companies: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -78,29 +122,85 @@ def create_drive():
     )
 
     db.session.add(drive)
+    # Job analysis, company research and skill vocabulary are precomputed in
+    # the background before the first student opens the drive
+    enqueue_drive_warmup(drive)
     db.session.commit()
 
     return jsonify({
         'message': 'Drive created',
-        'drive_id': drive.id
+        'drive_id': drive.id,
+        'warmup_status': drive.warmup_status
     }), 201
 
+@tpo_bp.route('/drives/<int:drive_id>', methods=['PUT'])
+@jwt_required()
+@role_required(['tpo'])
+def update_drive(drive_id):
+    drive = PlacementDrive.query.get_or_404(drive_id)
+    data = request.get_json()
+    analyzed_inputs = (drive.job_description, drive.job_requirements)
+
+    for field in ['job_title', 'job_description', 'job_requirements', 'eligibility_criteria',
+                  'ctc', 'location', 'status']:
+        if field in data:
+            setattr(drive, field, data[field])
+    if 'drive_date' in data:
+        drive.drive_date = datetime.fromisoformat(data['drive_date']) if data['drive_date'] else None
+    if 'registration_deadline' in data:
+        drive.registration_deadline = datetime.fromisoformat(data['registration_deadline']) if data['registration_deadline'] else None
+
+    # Warmed again only if the analyzed inputs changed or the last warm-up never succeeded
+    if (drive.job_description, drive.job_requirements) != analyzed_inputs or drive.warmup_status in (None, 'failed', 'disabled'):
+        enqueue_drive_warmup(drive)
+    db.session.commit()
+
+    return jsonify({'message': 'Drive updated', 'warmup_status': drive.warmup_status}), 200
+
 @tpo_bp.route('/drives', methods=['GET'])
 @jwt_required()
 def get_drives():
     try:
-        drives = PlacementDrive.query.all()
-
-        return jsonify([{
-            'id': d.id,
-            'company_name': d.company.name,
-            'job_title': d.job_title,
-            'ctc': d.ctc,
-            'location': d.location,
-            'drive_date': d.drive_date.isoformat() if d.drive_date else None,
-            'status': d.status,
-            'applications_count': len(d.applications)
-        } for d in drives]), 200
+        query = PlacementDrive.query.options(joinedload(PlacementDrive.company))
+        query = apply_filters(query, request.args, DRIVE_FILTERS)
+        page, next_cursor = paginate(query, request.args, DRIVE_SORTS, 'id')
+
+        # Application counts by status for this page of drives, aggregated in the database
+        status_counts = [
+            func.sum(case((Application.status == status, 1), else_=0))
+            for status in APPLICATION_STATUSES
+        ]
+        counts = {
+            drive_id: (total, by_status)
+            for drive_id, total, *by_status in db.session.query(
+                Application.drive_id,
+                func.count(Application.id),
+                *status_counts
+            )
+            .filter(Application.drive_id.in_([d.id for d in page]))
+            .group_by(Application.drive_id)
+        }
+
+        drives = []
+        for d in page:
+            total, by_status = counts.get(d.id, (0, [0] * len(APPLICATION_STATUSES)))
+            drives.append({
+                'id': d.id,
+                'company_name': d.company.name if d.company else None,
+                'job_title': d.job_title,
+                'ctc': d.ctc,
+                'location': d.location,
+                'drive_date': d.drive_date.isoformat() if d.drive_date else None,
+                'status': d.status,
+                'applications_count': total or 0,
+                'application_counts': {
+                    status: count or 0 for status, count in zip(APPLICATION_STATUSES, by_status)
+                }
+            })
+
+        return paginated_response(drives, next_cursor), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error getting drives: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -120,21 +220,31 @@ def get_drive_details(drive_id):
         'job_title': drive.job_title,
         'job_description': drive.job_description,
         'job_requirements': drive.job_requirements,
+        'job_analysis': drive.job_analysis,
+        'job_analysis_version': drive.job_analysis_version,
         'eligibility_criteria': drive.eligibility_criteria,
         'ctc': drive.ctc,
         'location': drive.location,
         'drive_date': drive.drive_date.isoformat() if drive.drive_date else None,
         'registration_deadline': drive.registration_deadline.isoformat() if drive.registration_deadline else None,
-        'status': drive.status
+        'status': drive.status,
+        'warmup': serialize_warmup(drive)
     }), 200
 
 @tpo_bp.route('/drives/<int:drive_id>/applications', methods=['GET'])
 @jwt_required()
 @role_required(['tpo'])
 def get_drive_applications(drive_id):
-    applications = Application.query.filter_by(drive_id=drive_id).all()
+    query = (
+        Application.query
+        .join(Application.student)
+        .options(contains_eager(Application.student))
+        .filter(Application.drive_id == drive_id)
+    )
+    query = apply_filters(query, request.args, DRIVE_APPLICATION_FILTERS)
+    applications, next_cursor = paginate(query, request.args, DRIVE_APPLICATION_SORTS, 'applied_at')
 
-    return jsonify([{
+    return paginated_response([{
         'id': app.id,
         'student_name': app.student.name,
         'enrollment_no': app.student.enrollment_no,
@@ -144,7 +254,50 @@ def get_drive_applications(drive_id):
         'ats_score': app.ats_score,
         'status': app.status,
         'applied_at': app.applied_at.isoformat()
-    } for app in applications]), 200
+    } for app in applications], next_cursor), 200
+
+@tpo_bp.route('/drives/<int:drive_id>/ranking', methods=['GET'])
+@jwt_required()
+@role_required(['tpo'])
+def rank_drive_applicants(drive_id):
+    """Re-rank all applicants of a drive against its analyzed requirements"""
+    drive = PlacementDrive.query.get_or_404(drive_id)
+
+    job_analysis = ensure_drive_job_analysis(drive)
+    if not job_analysis and not (drive.job_requirements or {}).get('skills'):
+        return jsonify({'error': 'Job requirements have not been analyzed yet'}), 409
+
+    filters = {
+        'min_cgpa': request.args.get('min_cgpa', type=float),
+        'max_cgpa': request.args.get('max_cgpa', type=float),
+        'departments': request.args.getlist('department'),
+        'statuses': request.args.getlist('status'),
+    }
+    top_k = max(request.args.get('top_k', default=50, type=int), 1)
+
+    return jsonify(rank_applicants(drive, job_analysis, top_k=top_k, filters=filters)), 200
+
+@tpo_bp.route('/llm-usage', methods=['GET'])
+@jwt_required()
+@role_required(['tpo'])
+def get_llm_usage():
+    """LLM calls, tokens, cost and latency aggregated by drive, student, user, day or stage"""
+    group_by = request.args.get('group_by', 'stage')
+    if group_by not in REPORT_GROUPS:
+        return jsonify({'error': f"group_by must be one of: {', '.join(REPORT_GROUPS)}"}), 400
+
+    try:
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO dates (YYYY-MM-DD)'}), 400
+    if end is not None and len(request.args['to']) == 10:
+        end += timedelta(days=1)  # a plain date includes that whole day
+
+    return jsonify({
+        'group_by': group_by,
+        'rows': usage_report(group_by, start=start, end=end, stage=request.args.get('stage'))
+    }), 200
 
 @tpo_bp.route('/rounds', methods=['POST'])
 @jwt_required()
@@ -171,43 +324,35 @@ def create_round():
 @jwt_required()
 @role_required(['tpo'])
 def update_round_results(round_id):
-    data = request.get_json()
-    results = data['results']  # [{application_id, status, feedback}, ...]
-
-    for result_data in results:
-        result = RoundResult.query.filter_by(
-            application_id=result_data['application_id'],
-            round_id=round_id
-        ).first()
+    """Record results for a round from JSON {results: [...]} or a CSV upload"""
+    selection_round = SelectionRound.query.get_or_404(round_id)
 
-        if result:
-            result.status = result_data['status']
-            result.feedback = result_data.get('feedback')
+    try:
+        if 'file' in request.files:
+            rows = parse_results_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            rows = parse_results_csv(request.get_data(as_text=True))
         else:
-            result = RoundResult(
-                application_id=result_data['application_id'],
-                round_id=round_id,
-                status=result_data['status'],
-                feedback=result_data.get('feedback')
-            )
-            db.session.add(result)
-
-        # Update application status if rejected
-        if result_data['status'] == 'rejected':
-            application = Application.query.get(result_data['application_id'])
-            application.status = 'rejected'
-
-        # Send email notification
-        application = Application.query.get(result_data['application_id'])
-        send_email_notification(
-            to=application.student.user.email,
-            subject=f"Round Update - {result_data['status'].title()}",
-            body=f"Your status for round {round_id}: {result_data['status']}"
-        )
+            data = request.get_json(silent=True) or {}
+            rows = data.get('results')  # [{application_id, status, feedback}, ...]
+            if not isinstance(rows, list):
+                raise RoundResultsError('results must be a list')
+        summary = upsert_round_results(selection_round, rows)
+    except (RoundResultsError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
 
+    # Notifications are committed with the results and sent by the outbox dispatcher
+    queued = queue_emails(summary['notifications'])
     db.session.commit()
 
-    return jsonify({'message': 'Results updated'}), 200
+    return jsonify({
+        'message': 'Results updated',
+        'processed': summary['processed'],
+        'rejected_applications': summary['rejected_applications'],
+        'notifications_queued': queued,
+        'errors': summary['errors']
+    }), 200
 
 @tpo_bp.route('/applications/<int:app_id>/select', methods=['POST'])
 @jwt_required()
@@ -216,15 +361,15 @@ def select_candidate(app_id):
     application = Application.query.get_or_404(app_id)
     application.status = 'selected'
 
-    db.session.commit()
-
-    # Send selection email
-    send_email_notification(
+    # Selection email, committed with the status change
+    queue_email(
         to=application.student.user.email,
         subject="Congratulations! You've been selected",
         body=f"You have been selected for {application.drive.job_title} at {application.drive.company.name}"
     )
 
+    db.session.commit()
+
     return jsonify({'message': 'Candidate selected'}), 200
 
 @tpo_bp.route('/applications/<int:app_id>/offer-letter', methods=['POST'])
@@ -250,14 +395,15 @@ def upload_offer_letter(app_id):
         file_path=filepath
     )
     db.session.add(offer)
-    db.session.commit()
 
-    # Send email
+    # Email, committed with the offer letter record
     application = Application.query.get(app_id)
-    send_email_notification(
+    queue_email(
         to=application.student.user.email,
         subject="Your Offer Letter is Ready",
         body="Your offer letter has been uploaded. Please login to download."
     )
 
+    db.session.commit()
+
     return jsonify({'message': 'Offer letter uploaded'}), 201
@@ -0,0 +1,259 @@
+"""
+Benchmark the route queries with and without the index/constraint pack.
+
+Seeds a database with 50k students (plus drives, applications and round
+results), then prints the query plan and median latency of each hot route
+query before and after the pack from migration 0003_index_constraint_pack is
+created.
+
+Usage (from backend/):
+
+    python scripts/benchmark_indexes.py                            # temporary SQLite file
+    BENCH_DATABASE_URL=postgresql://localhost/bench python scripts/benchmark_indexes.py
+
+The app's own DATABASE_URL is never used. The target database must be empty
+(the script refuses to run when any table has rows); it creates and drops its
+own tables.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Index, MetaData, create_engine, func, inspect, literal, select, table, text
+
+from models import (Application, Company, PlacementDrive, RoundResult,
+                    SelectionRound, Student, User, db)
+from services.eligibility import compile_eligibility, not_applied_by
+
+STUDENTS = int(os.getenv('BENCH_STUDENTS', 50000))
+COMPANIES = 400
+DRIVES = 600
+APPLICATIONS_PER_STUDENT = 5
+ROUNDS_PER_DRIVE = 3
+REPEAT = int(os.getenv('BENCH_REPEAT', 25))
+DEPARTMENTS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'CHEM', 'AIML']
+
+PACK_INDEXES = {
+    'ix_students_department_is_approved',
+    'ix_parsed_resumes_student_id',
+    'ix_resume_ingestions_student_id_status',
+    'ix_companies_name',
+    'ix_placement_drives_status',
+    'ix_applications_drive_id_status',
+    'ix_analysis_jobs_status_created_at',
+    'ix_analysis_jobs_student_id_drive_id_status',
+}
+PACK_UNIQUE = {
+    'uq_applications_student_id_drive_id': ('applications', ('student_id', 'drive_id')),
+    'uq_round_results_application_id_round_id': ('round_results', ('application_id', 'round_id')),
+}
+
+
+def schema_without_pack():
+    """Copy of the model metadata as it was before the pack."""
+    metadata = MetaData()
+    for source in db.metadata.sorted_tables:
+        copy = source.to_metadata(metadata)
+        for index in list(copy.indexes):
+            if index.name in PACK_INDEXES:
+                copy.indexes.discard(index)
+        for constraint in list(copy.constraints):
+            if constraint.name in PACK_UNIQUE:
+                copy.constraints.discard(constraint)
+    return metadata
+
+
+def create_pack(engine, metadata):
+    # Unique constraints are created as unique indexes, which is what both
+    # SQLite and PostgreSQL use to enforce them.
+    with engine.begin() as conn:
+        for source in db.metadata.sorted_tables:
+            target = metadata.tables[source.name]
+            for index in source.indexes:
+                if index.name in PACK_INDEXES:
+                    Index(index.name, *[target.c[c.name] for c in index.columns]).create(conn)
+        for name, (table_name, columns) in PACK_UNIQUE.items():
+            target = metadata.tables[table_name]
+            Index(name, *[target.c[column] for column in columns], unique=True).create(conn)
+        conn.execute(text('ANALYZE'))
+
+
+def seed(engine):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.edu', 'password_hash': 'x', 'role': 'student', 'created_at': now}
+            for i in range(1, STUDENTS + 1)
+        ])
+        conn.execute(Student.__table__.insert(), [
+            {
+                'id': i,
+                'user_id': i,
+                'name': f'Student {i}',
+                'enrollment_no': f'EN{i:06d}',
+                'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+                'cgpa': round(rng.uniform(5.0, 10.0), 2),
+                'skills': ['python', 'sql'],
+                'is_approved': rng.random() < 0.85,
+                'created_at': now,
+            }
+            for i in range(1, STUDENTS + 1)
+        ])
+        conn.execute(Company.__table__.insert(), [
+            {'id': i, 'name': f'Company {i}', 'created_at': now} for i in range(1, COMPANIES + 1)
+        ])
+        conn.execute(PlacementDrive.__table__.insert(), [
+            {
+                'id': i,
+                'company_id': rng.randint(1, COMPANIES),
+                'job_title': f'Engineer {i}',
+                'job_description': 'Build things',
+                'eligibility_criteria': {
+                    'min_cgpa': rng.choice([None, 6.0, 7.0, 7.5]),
+                    'departments': rng.sample(DEPARTMENTS, 3),
+                },
+                'status': 'active' if i % 10 == 0 else rng.choice(['completed', 'cancelled']),
+                'created_at': now,
+            }
+            for i in range(1, DRIVES + 1)
+        ])
+
+        applications = []
+        for student_id in range(1, STUDENTS + 1):
+            for drive_id in rng.sample(range(1, DRIVES + 1), APPLICATIONS_PER_STUDENT):
+                applications.append({
+                    'id': len(applications) + 1,
+                    'student_id': student_id,
+                    'drive_id': drive_id,
+                    'status': rng.choice(['applied', 'applied', 'shortlisted', 'rejected', 'selected']),
+                    'applied_at': now,
+                })
+        conn.execute(Application.__table__.insert(), applications)
+
+        conn.execute(SelectionRound.__table__.insert(), [
+            {
+                'id': (drive_id - 1) * ROUNDS_PER_DRIVE + number,
+                'drive_id': drive_id,
+                'round_name': f'Round {number}',
+                'round_number': number,
+                'created_at': now,
+            }
+            for drive_id in range(1, DRIVES + 1)
+            for number in range(1, ROUNDS_PER_DRIVE + 1)
+        ])
+        conn.execute(RoundResult.__table__.insert(), [
+            {
+                'application_id': application['id'],
+                'round_id': (application['drive_id'] - 1) * ROUNDS_PER_DRIVE + 1,
+                'status': 'pending',
+                'updated_at': now,
+            }
+            for application in applications
+            if application['status'] != 'applied'
+        ])
+        conn.execute(text('ANALYZE'))
+    return applications
+
+
+def route_queries(applications):
+    """(route, query) pairs mirroring what each route sends to the database."""
+    sample = applications[len(applications) // 2]
+    student = SimpleNamespace(id=sample['student_id'], cgpa=8.1, department='CSE')
+    return [
+        ('auth / student profile by user_id',
+         select(Student).where(Student.user_id == sample['student_id'])),
+        ('GET /hod/students/pending',
+         select(Student).where(Student.department == 'ECE', Student.is_approved.is_(False))),
+        ('GET /hod/statistics (approved count)',
+         select(func.count()).select_from(Student).where(Student.department == 'ECE', Student.is_approved.is_(True))),
+        ('GET /student/drives/available',
+         select(PlacementDrive, Company)
+         .outerjoin(Company, PlacementDrive.company_id == Company.id)
+         .where(PlacementDrive.status == 'active', compile_eligibility(student), not_applied_by(student))),
+        ('POST /ai/apply (already applied?)',
+         select(Application).where(Application.student_id == sample['student_id'],
+                                   Application.drive_id == sample['drive_id'])),
+        ('GET /tpo/drives/<id>/ranking (applicants by status)',
+         select(Application.id).where(Application.drive_id == sample['drive_id'],
+                                      Application.status.in_(['applied', 'shortlisted']))),
+        ('POST /tpo/rounds/<id>/results (existing result)',
+         select(RoundResult).where(RoundResult.application_id == sample['id'],
+                                   RoundResult.round_id == (sample['drive_id'] - 1) * ROUNDS_PER_DRIVE + 1)),
+        ('company research (company by name)',
+         select(Company).where(Company.name == 'Company 123')),
+    ]
+
+
+def explain(conn, statement):
+    compiled = statement.compile(conn, compile_kwargs={'literal_binds': True})
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).fetchall()
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.execute(text(f'EXPLAIN {compiled}'))]
+
+
+def measure(engine, queries):
+    results = {}
+    with engine.connect() as conn:
+        for name, statement in queries:
+            conn.execute(statement).fetchall()  # warm the page cache
+            samples = []
+            for _ in range(REPEAT):
+                started = time.perf_counter()
+                conn.execute(statement).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(samples), explain(conn, statement))
+    return results
+
+
+def tables_with_rows(engine):
+    with engine.connect() as conn:
+        return [
+            name for name in inspect(conn).get_table_names()
+            if conn.execute(select(literal(1)).select_from(table(name)).limit(1)).first() is not None
+        ]
+
+
+def main():
+    url = os.getenv('BENCH_DATABASE_URL')
+    if not url:
+        url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(url)
+    populated = tables_with_rows(engine)
+    if populated:
+        sys.exit(f"Refusing to benchmark {engine.url.render_as_string(hide_password=True)}: "
+                 f"tables already hold data ({', '.join(populated)}). Point BENCH_DATABASE_URL at an empty database.")
+    metadata = schema_without_pack()
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    started = time.perf_counter()
+    applications = seed(engine)
+    print(f"Seeded {STUDENTS} students and {len(applications)} applications "
+          f"on {engine.dialect.name} in {time.perf_counter() - started:.1f}s\n")
+
+    queries = route_queries(applications)
+    before = measure(engine, queries)
+    create_pack(engine, metadata)
+    after = measure(engine, queries)
+
+    for name, _ in queries:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        print(f"{name}: {before_ms:.2f} ms -> {after_ms:.2f} ms")
+        print("  before: " + " | ".join(before_plan))
+        print("  after:  " + " | ".join(after_plan))
+
+    metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
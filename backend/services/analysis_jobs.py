@@ -0,0 +1,212 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from models import AnalysisJob, PlacementDrive, Student, db
+from services.analysis_pipeline import PipelineError, run_job_fit_analysis
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('completed', 'failed')
+
+_wakeup = threading.Event()
+_workers = []
+
+
+def serialize_job(job, include_result=True):
+    """JSON-ready representation of an analysis job."""
+    payload = {
+        'job_id': job.id,
+        'drive_id': job.drive_id,
+        'status': job.status,
+        'current_stage': job.current_stage,
+        'progress': job.progress or {},
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if include_result:
+        payload['result'] = job.result
+    return payload
+
+
+def enqueue_analysis_job(student, drive):
+    """
+    Queue a job-fit analysis, reusing an identical job that is still queued
+    or running.
+
+    Returns:
+        AnalysisJob: the queued (or already active) job.
+    """
+    job = AnalysisJob.query.filter(
+        AnalysisJob.student_id == student.id,
+        AnalysisJob.drive_id == drive.id,
+        AnalysisJob.status.in_(ACTIVE_STATUSES),
+    ).first()
+    if job:
+        return job
+
+    job = AnalysisJob(student_id=student.id, drive_id=drive.id, status='queued', progress={})
+    db.session.add(job)
+    db.session.commit()
+
+    _wakeup.set()
+    return job
+
+
+def _requeue_stale_jobs(app):
+    """Return jobs whose worker stopped heart-beating to the queue (or fail them)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['ANALYSIS_JOB_STALE_SECONDS'])
+    stale = (AnalysisJob.status == 'running') & (AnalysisJob.heartbeat_at < cutoff)
+    max_attempts = app.config['ANALYSIS_JOB_MAX_ATTEMPTS']
+
+    db.session.execute(
+        update(AnalysisJob)
+        .where(stale, AnalysisJob.attempts >= max_attempts)
+        .values(status='failed', error='Analysis worker stopped responding', finished_at=datetime.utcnow())
+    )
+    db.session.execute(
+        update(AnalysisJob)
+        .where(stale, AnalysisJob.attempts < max_attempts)
+        .values(status='queued', worker_id=None)
+    )
+    db.session.commit()
+
+
+def _claim_next_job(worker_id):
+    """Atomically move the oldest queued job to running for this worker."""
+    candidates = (
+        db.session.query(AnalysisJob.id)
+        .filter(AnalysisJob.status == 'queued')
+        .order_by(AnalysisJob.created_at, AnalysisJob.id)
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.status == 'queued')
+            .values(
+                status='running',
+                worker_id=worker_id,
+                attempts=AnalysisJob.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+            )
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(AnalysisJob, job_id)
+    return None
+
+
+def _owned(job_id, worker_id):
+    return (
+        (AnalysisJob.id == job_id)
+        & (AnalysisJob.worker_id == worker_id)
+        & (AnalysisJob.status == 'running')
+    )
+
+
+def _update_owned(job_id, worker_id, **values):
+    """Write to a job only while this worker still owns it; returns whether it did."""
+    written = db.session.execute(update(AnalysisJob).where(_owned(job_id, worker_id)).values(**values))
+    db.session.commit()
+    return written.rowcount == 1
+
+
+def _heartbeat_loop(app, job_id, worker_id, stop):
+    # Long stages (deep research) emit no events, so beat on a timer
+    interval = app.config['ANALYSIS_JOB_STALE_SECONDS'] / 3
+    while not stop.wait(interval):
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                conn.execute(
+                    update(AnalysisJob)
+                    .where(_owned(job_id, worker_id))
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+        except Exception as e:
+            print(f"Analysis job {job_id} heartbeat error: {e}")
+
+
+def _process_job(app, job):
+    job_id, worker_id = job.id, job.worker_id
+    progress = dict(job.progress or {})
+
+    def on_event(stage, status, elapsed_ms=None):
+        progress[stage] = {'status': status, 'elapsed_ms': elapsed_ms}
+        _update_owned(
+            job_id, worker_id,
+            progress=dict(progress), current_stage=stage, heartbeat_at=datetime.utcnow()
+        )
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop,
+        args=(app, job_id, worker_id, stop),
+        name=f"analysis-job-heartbeat-{job_id}",
+        daemon=True,
+    )
+    heartbeat.start()
+
+    outcome = {'result': None, 'error': None}
+    try:
+        student = db.session.get(Student, job.student_id)
+        drive = db.session.get(PlacementDrive, job.drive_id)
+        if student is None or drive is None:
+            raise PipelineError('Student or drive no longer exists', status_code=404)
+
+        outcome['result'] = run_job_fit_analysis(student, drive, on_event=on_event)
+        outcome['status'] = 'completed'
+    except PipelineError as e:
+        outcome.update(status='failed', error=e.message)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Analysis job {job_id} error: {e}")
+        outcome.update(status='failed', error='Analysis failed')
+    finally:
+        stop.set()
+
+    # A worker that lost the job (requeued as stale) must not overwrite its new run
+    if not _update_owned(job_id, worker_id, current_stage=None, finished_at=datetime.utcnow(), **outcome):
+        print(f"Analysis job {job_id} was taken over by another worker; result dropped")
+
+
+def _worker_loop(app, worker_id):
+    poll_seconds = app.config['ANALYSIS_JOB_POLL_SECONDS']
+    while True:
+        try:
+            with app.app_context():
+                _requeue_stale_jobs(app)
+                job = _claim_next_job(worker_id)
+                if job is not None:
+                    _process_job(app, job)
+                    continue
+        except Exception as e:
+            print(f"Analysis worker {worker_id} error: {e}")
+
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+
+
+def start_analysis_workers(app):
+    """Start the in-process workers that drain the analysis job queue."""
+    count = app.config.get('ANALYSIS_JOB_WORKERS', 0)
+    if _workers or count <= 0:
+        return
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for index in range(count):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(app, f"{prefix}:{index}"),
+            name=f"analysis-job-worker-{index}",
+            daemon=True,
+        )
+        worker.start()
+        _workers.append(worker)
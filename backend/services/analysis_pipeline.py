@@ -0,0 +1,263 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from flask import current_app
+
+from models import PlacementDrive, Student, db
+from services.company_research import ensure_drive_job_analysis, get_company_facts, tailor_company_research
+from services.resume_ingestion import wait_for_resume_ingestion
+from services.resume_store import get_parsed_resume, get_resume_text
+from services.resume_service import (
+    calculate_match_score,
+    calculate_ats_score,
+    identify_skills_gap,
+    prepare_personalized_resume,
+)
+from services.llm_ledger import current_attribution, llm_attribution
+from utils.metrics import analysis_stage_duration
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+# Thread pool of each kind of stage and the config key sizing it. Research can
+# block for minutes on deep research, so it gets a pool of its own and never
+# holds the threads that parse, ATS and match stages of other requests need.
+POOL_SIZES = {
+    'default': ('ANALYSIS_PIPELINE_WORKERS', 6),
+    'research': ('ANALYSIS_RESEARCH_WORKERS', 4),
+}
+
+
+class PipelineError(Exception):
+    """Raised when a required pipeline stage could not produce a result."""
+
+    def __init__(self, message, status_code=500, stage=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.stage = stage
+
+
+class Stage:
+    """A unit of work in the analysis graph.
+
+    ``func`` is called with one keyword argument per dependency, holding that
+    dependency's result. When ``required`` is set and the stage returns a
+    falsy value, the pipeline aborts with that message. ``pool`` names the
+    thread pool (a POOL_SIZES key) the stage runs on.
+    """
+
+    def __init__(self, name, func, depends_on=(), required=None, pool='default'):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.required = required
+        self.pool = pool
+
+
+def _get_executor(pool):
+    executor = _executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                config_key, default_size = POOL_SIZES[pool]
+                executor = _executors[pool] = ThreadPoolExecutor(
+                    max_workers=current_app.config.get(config_key, default_size),
+                    thread_name_prefix=f'analysis-{pool}',
+                )
+    return executor
+
+
+def _run_stage(app, stage, inputs, attribution):
+    """Execute a stage inside its own app context (and DB session)."""
+    with app.app_context(), llm_attribution(**attribution):
+        started = time.perf_counter()
+        try:
+            return stage.func(**inputs), time.perf_counter() - started
+        finally:
+            analysis_stage_duration.observe(time.perf_counter() - started, stage.name)
+
+
+def run_stages(stages, on_event=None):
+    """
+    Run stages as a dependency graph, starting each one as soon as all of its
+    dependencies have finished.
+
+    Args:
+        stages (list): Stage objects making up the graph.
+        on_event (callable): Optional ``on_event(stage, status, elapsed_ms)``
+            hook called from the calling thread as stages start ("running"),
+            finish ("completed") or abort the graph ("failed").
+
+    Returns:
+        tuple: (results keyed by stage name, timings in milliseconds)
+    """
+    app = current_app._get_current_object()
+    timeout = app.config.get('ANALYSIS_PIPELINE_TIMEOUT_SECONDS', 1200)
+
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    results = {}
+    timings = {}
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    notify = on_event or (lambda stage, status, elapsed_ms=None: None)
+    # LLM calls on stage threads are attributed like the caller's
+    attribution = current_attribution()
+
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dep in results for dep in stage.depends_on):
+                    inputs = {dep: results[dep] for dep in stage.depends_on}
+                    future = _get_executor(stage.pool).submit(_run_stage, app, stage, inputs, attribution)
+                    running[future] = stage
+                    del pending[name]
+                    notify(name, 'running')
+
+            if not running:
+                raise PipelineError(
+                    f"Unsatisfiable stage dependencies: {', '.join(sorted(pending))}"
+                )
+
+            done, _ = wait(running, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                # Stages already running finish in the background; their results are dropped
+                for stage in running.values():
+                    notify(stage.name, 'failed')
+                raise PipelineError(
+                    'Analysis timed out', status_code=504,
+                    stage=', '.join(sorted(stage.name for stage in running.values()))
+                )
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    value, elapsed = future.result()
+                except Exception:
+                    notify(stage.name, 'failed')
+                    raise
+                timings[stage.name] = round(elapsed * 1000, 1)
+
+                if stage.required and not value:
+                    notify(stage.name, 'failed', timings[stage.name])
+                    raise PipelineError(stage.required, stage=stage.name)
+                results[stage.name] = value
+                notify(stage.name, 'completed', timings[stage.name])
+    finally:
+        # Stages that have not started yet are dropped when the graph aborts.
+        for future in running:
+            future.cancel()
+
+    timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+    return results, timings
+
+
+def build_job_fit_stages(student, drive, explain_ats=False):
+    """
+    Describe the job-fit analysis as a stage graph.
+
+    Only plain values are captured from ``student`` and ``drive`` so that the
+    stages can run on worker threads with their own DB sessions.
+    """
+    student_id = student.id
+    drive_id = drive.id
+    resume_path = student.resume_path
+    company_name = drive.company.name
+    company_website = drive.company.website
+    job_title = drive.job_title
+    job_description = drive.job_description
+
+    def extract():
+        # Reuse the upload-time ingestion instead of parsing inline.
+        wait_for_resume_ingestion(student_id)
+        return get_resume_text(student_id, resume_path)
+
+    def parse(extract):
+        return get_parsed_resume(student_id, resume_path, extract)
+
+    def company_facts():
+        # Slow deep research does not wait for the resume
+        return get_company_facts(company_name, company_website)
+
+    def research(company_facts, parse):
+        return tailor_company_research(
+            company_facts,
+            job_title=job_title,
+            job_description=job_description,
+            student_profile={
+                "summary": parse.get("summary"),
+                "skills": parse.get("skills"),
+                "experience": parse.get("experience"),
+                "projects": parse.get("projects"),
+            },
+        )
+
+    def job_analysis():
+        return ensure_drive_job_analysis(db.session.get(PlacementDrive, drive_id))
+
+    def match(parse, job_analysis, research):
+        return calculate_match_score(parse, job_analysis, research)
+
+    def ats(extract, job_analysis):
+        all_keywords = (job_analysis.get('required_skills', []) +
+                        job_analysis.get('preferred_skills', []) +
+                        job_analysis.get('must_have_keywords', []))
+        return calculate_ats_score(extract, all_keywords, explain=explain_ats)
+
+    def skills_gap(parse, job_analysis):
+        return identify_skills_gap(
+            parse.get('skills', []),
+            job_analysis.get('required_skills', []),
+            job_analysis.get('preferred_skills', [])
+        )
+
+    def personalize(parse, job_analysis, research, match, skills_gap):
+        return prepare_personalized_resume(
+            db.session.get(Student, student_id),
+            db.session.get(PlacementDrive, drive_id),
+            parse,
+            job_analysis,
+            research,
+            match,
+            skills_gap,
+        )
+
+    return [
+        Stage('extract', extract, required='Could not read resume'),
+        Stage('parse', parse, ['extract'], required='Could not parse resume'),
+        Stage('company_facts', company_facts, pool='research'),
+        Stage('research', research, ['company_facts', 'parse']),
+        Stage('job_analysis', job_analysis, required='Could not analyze job requirements'),
+        Stage('match', match, ['parse', 'job_analysis', 'research']),
+        Stage('ats', ats, ['extract', 'job_analysis']),
+        Stage('skills_gap', skills_gap, ['parse', 'job_analysis']),
+        Stage('personalize', personalize,
+              ['parse', 'job_analysis', 'research', 'match', 'skills_gap']),
+    ]
+
+
+def run_job_fit_analysis(student, drive, on_event=None, explain_ats=False):
+    """Run the full job-fit analysis for a student and drive."""
+    if not student.resume_path:
+        raise PipelineError('Please upload resume first', status_code=400)
+
+    with llm_attribution(user_id=student.user_id, student_id=student.id, drive_id=drive.id):
+        results, timings = run_stages(
+            build_job_fit_stages(student, drive, explain_ats=explain_ats),
+            on_event=on_event,
+        )
+    personalized_content, personalized_pdf_path = results['personalize']
+
+    return {
+        'company_research': results['research'],
+        'job_analysis': results['job_analysis'],
+        'match_analysis': results['match'],
+        'ats_analysis': results['ats'],
+        'skills_gap': results['skills_gap'],
+        'personalized_content': personalized_content,
+        'personalized_resume_pdf': personalized_pdf_path.replace('\\', '/') if personalized_pdf_path else None,
+        'parsed_resume': results['parse'],
+        'stage_timings': timings,
+    }
@@ -0,0 +1,299 @@
+"""
+Bulk ranking of a drive's applicants with a TF-IDF term-weight matrix.
+
+The vocabulary is the drive's analyzed skills and keywords, folded through
+services.ats_engine so that synonyms and inflections collapse onto one
+term. Resumes are read as the canonical token text stored in the
+parsed-resume store, so building the matrix is one token count per
+resume (memoized per vocabulary and resume hash) followed by a handful of
+NumPy operations over the whole drive.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+from sqlalchemy import case
+
+from models import Application, ParsedResume, Student, db
+from services.ats_engine import canonical_tokens
+
+# Weight of each job-analysis field in the query vector
+VOCABULARY_WEIGHTS = {
+    "required_skills": 2.0,
+    "must_have_keywords": 2.0,
+    "preferred_skills": 1.0,
+    "nice_to_have_keywords": 0.5,
+}
+
+
+def build_skill_vocabulary(job_analysis, job_requirements=None):
+    """
+    Build the shared vocabulary for a drive.
+
+    Returns:
+        list: dicts with ``term`` (display spelling), ``tokens`` (canonical
+        token tuple) and ``weight``, de-duplicated by canonical form.
+    """
+    weighted_terms = []
+    for field, weight in VOCABULARY_WEIGHTS.items():
+        for term in (job_analysis or {}).get(field) or []:
+            weighted_terms.append((term, weight))
+
+    requirement_skills = (job_requirements or {}).get("skills")
+    if isinstance(requirement_skills, list):
+        weighted_terms.extend((term, VOCABULARY_WEIGHTS["required_skills"]) for term in requirement_skills)
+
+    vocabulary = {}
+    for term, weight in weighted_terms:
+        if not isinstance(term, str):
+            continue
+        tokens = tuple(canonical_tokens(term))
+        if not tokens:
+            continue
+        if tokens not in vocabulary:
+            vocabulary[tokens] = {"term": term.strip(), "tokens": tokens, "weight": weight}
+        else:
+            vocabulary[tokens]["weight"] = max(vocabulary[tokens]["weight"], weight)
+
+    return list(vocabulary.values())
+
+
+def drive_skill_vocabulary(drive, job_analysis):
+    """
+    The drive's vocabulary: precomputed by its warm-up when that was built
+    from the current job analysis, otherwise built now.
+    """
+    stored = drive.skill_vocabulary or {}
+    if (
+        stored.get("terms") is not None
+        and job_analysis is drive.job_analysis
+        and stored.get("analysis_version") == drive.job_analysis_version
+        and stored.get("analysis_hash") == drive.job_analysis_hash
+    ):
+        return [dict(entry, tokens=tuple(entry["tokens"])) for entry in stored["terms"]]
+    return build_skill_vocabulary(job_analysis, drive.job_requirements)
+
+
+def _padded(canonical_text):
+    """
+    Surround every token with its own pair of spaces so that ``str.count`` of
+    " term " counts whole-token occurrences, including adjacent repeats.
+    """
+    return " " + canonical_text.replace(" ", "  ") + " "
+
+
+def _term_counts(canonical_text, terms):
+    """
+    Count occurrences of each (tokens, pattern) term in a canonical text.
+
+    Single-token terms come straight from a token Counter; phrases are only
+    searched for when all of their tokens occur in the text.
+    """
+    token_counts = Counter(canonical_text.split())
+    padded = None
+    row = []
+    for tokens, pattern in terms:
+        if len(tokens) == 1:
+            row.append(token_counts.get(tokens[0], 0))
+        elif all(token in token_counts for token in tokens):
+            if padded is None:
+                padded = _padded(canonical_text)
+            row.append(padded.count(pattern))
+        else:
+            row.append(0)
+    return tuple(row)
+
+
+class _CountRowCache:
+    """LRU of per-resume term-count rows keyed by (vocabulary, content hash)."""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._rows.move_to_end(key)
+            return row
+
+    def put(self, key, row):
+        with self._lock:
+            self._rows[key] = row
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+
+_count_rows = _CountRowCache()
+
+
+def vocabulary_key(vocabulary):
+    """Stable identifier of a vocabulary's term columns."""
+    return "|".join(" ".join(entry["tokens"]) for entry in vocabulary)
+
+
+def _load_applicants(drive_id, filters):
+    query = (
+        db.session.query(
+            Application.id.label("application_id"),
+            Application.status,
+            Application.match_score,
+            Student.id.label("student_id"),
+            Student.name,
+            Student.enrollment_no,
+            Student.department,
+            Student.cgpa,
+            Student.skills,
+            ParsedResume.content_hash,
+        )
+        .join(Student, Application.student_id == Student.id)
+        .outerjoin(ParsedResume, ParsedResume.student_id == Student.id)
+        .filter(Application.drive_id == drive_id)
+    )
+    if filters.get("min_cgpa") is not None:
+        query = query.filter(Student.cgpa >= filters["min_cgpa"])
+    if filters.get("max_cgpa") is not None:
+        query = query.filter(Student.cgpa <= filters["max_cgpa"])
+    if filters.get("departments"):
+        query = query.filter(Student.department.in_(filters["departments"]))
+    if filters.get("statuses"):
+        query = query.filter(Application.status.in_(filters["statuses"]))
+
+    applicants = {}
+    for row in query.order_by(Application.id, ParsedResume.id.desc()):
+        # Keep one stored resume per application (the newest).
+        applicants.setdefault(row.application_id, row)
+    return list(applicants.values())
+
+
+def _load_canonical_texts(content_hashes):
+    """Fetch canonical resume text for the given hashes, in chunks."""
+    texts = {}
+    hashes = list(content_hashes)
+    for offset in range(0, len(hashes), 500):
+        rows = db.session.query(
+            ParsedResume.content_hash,
+            ParsedResume.canonical_text,
+            # Only needed for entries stored before canonical_text existed
+            case((ParsedResume.canonical_text.is_(None), ParsedResume.resume_text), else_=None),
+        ).filter(ParsedResume.content_hash.in_(hashes[offset:offset + 500]))
+        for content_hash, canonical_text, resume_text in rows:
+            texts[content_hash] = canonical_text or " ".join(canonical_tokens(resume_text or ""))
+    return texts
+
+
+def count_matrix(applicants, vocabulary):
+    """Build the (applicants x terms) count matrix, reusing cached resume rows."""
+    terms = [(entry["tokens"], _padded(" ".join(entry["tokens"]))) for entry in vocabulary]
+    key = vocabulary_key(vocabulary)
+
+    rows = [
+        _count_rows.get((key, applicant.content_hash)) if applicant.content_hash else None
+        for applicant in applicants
+    ]
+    missing = {
+        applicant.content_hash
+        for applicant, row in zip(applicants, rows)
+        if row is None and applicant.content_hash
+    }
+    texts = _load_canonical_texts(missing) if missing else {}
+
+    for index, applicant in enumerate(applicants):
+        if rows[index] is not None:
+            continue
+        if applicant.content_hash in texts:
+            rows[index] = _term_counts(texts[applicant.content_hash], terms)
+            _count_rows.put((key, applicant.content_hash), rows[index])
+        else:
+            # No stored resume: fall back to the skills on the student profile.
+            skills_text = " ".join(canonical_tokens(" ; ".join(applicant.skills or [])))
+            rows[index] = _term_counts(skills_text, terms)
+
+    return np.array(rows, dtype=np.float32).reshape(len(applicants), len(vocabulary))
+
+
+def tfidf_scores(counts, vocabulary):
+    """
+    Score every row of a term-count matrix against the weighted vocabulary.
+
+    Returns:
+        ndarray: cosine similarity of each row's TF-IDF vector with the
+        weighted query vector, scaled to 0-100.
+    """
+    n_docs = counts.shape[0]
+
+    # Smoothed TF-IDF over the shared vocabulary
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + n_docs) / (1.0 + document_frequency)).astype(np.float32) + 1.0
+    tfidf = np.log1p(counts) * idf
+
+    norms = np.linalg.norm(tfidf, axis=1)
+    norms[norms == 0] = 1.0
+    tfidf /= norms[:, None]
+
+    query = np.asarray([entry["weight"] for entry in vocabulary], dtype=np.float32) * idf
+    query /= np.linalg.norm(query) or 1.0
+
+    return tfidf @ query * 100.0
+
+
+def rank_applicants(drive, job_analysis, top_k=50, filters=None):
+    """
+    Rank a drive's applicants against its analyzed requirements.
+
+    Args:
+        drive (PlacementDrive): drive whose applications are ranked.
+        job_analysis (dict): output of the drive's job-requirement analysis.
+        top_k (int): number of applicants to return (None for all).
+        filters (dict): optional min_cgpa, max_cgpa, departments, statuses.
+
+    Returns:
+        dict: ranking payload with the vocabulary, counts and top applicants.
+    """
+    started = time.perf_counter()
+    vocabulary = drive_skill_vocabulary(drive, job_analysis)
+    applicants = _load_applicants(drive.id, filters or {})
+
+    if not vocabulary or not applicants:
+        scores = np.zeros(len(applicants), dtype=np.float32)
+        counts = np.zeros((len(applicants), len(vocabulary)), dtype=np.float32)
+    else:
+        counts = count_matrix(applicants, vocabulary)
+        scores = tfidf_scores(counts, vocabulary)
+
+    k = len(applicants) if top_k is None else min(top_k, len(applicants))
+    if 0 < k < len(applicants):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(applicants))
+    top = top[np.argsort(-scores[top], kind="stable")][:k]
+
+    ranked = []
+    for rank, row in enumerate(top, start=1):
+        applicant = applicants[row]
+        matched = [vocabulary[col]["term"] for col in np.flatnonzero(counts[row])]
+        ranked.append({
+            "rank": rank,
+            "application_id": applicant.application_id,
+            "student_id": applicant.student_id,
+            "student_name": applicant.name,
+            "enrollment_no": applicant.enrollment_no,
+            "department": applicant.department,
+            "cgpa": applicant.cgpa,
+            "status": applicant.status,
+            "score": round(float(scores[row]), 2),
+            "matched_terms": matched,
+            "match_score": applicant.match_score,
+        })
+
+    return {
+        "drive_id": drive.id,
+        "total_ranked": len(applicants),
+        "vocabulary": [entry["term"] for entry in vocabulary],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "applicants": ranked,
+    }
@@ -0,0 +1,258 @@
+"""
+Local, deterministic ATS (Applicant Tracking System) scoring.
+
+Keywords and resume text go through the same pipeline: lower-casing,
+tokenization that keeps tech tokens such as "c++", "c#", "node.js" and
+"ci/cd" intact (hyphens split words), a light suffix stemmer and a synonym
+table that folds aliases ("js", "k8s", ...) onto one canonical form. A
+keyword matches when its canonical token sequence appears contiguously in
+the resume.
+"""
+import re
+
+# canonical skill -> aliases (all written in lower case)
+SKILL_SYNONYMS = {
+    "javascript": ["js", "ecmascript", "es6"],
+    "typescript": ["ts"],
+    "node.js": ["nodejs", "node js"],
+    "react": ["react.js", "reactjs", "react js"],
+    "vue": ["vue.js", "vuejs"],
+    "angular": ["angularjs", "angular.js"],
+    "next.js": ["nextjs", "next js"],
+    "express": ["express.js", "expressjs"],
+    "kubernetes": ["k8s"],
+    "postgresql": ["postgres", "psql"],
+    "mongodb": ["mongo"],
+    "mysql": ["my sql"],
+    "amazon web services": ["aws"],
+    "google cloud platform": ["gcp", "google cloud"],
+    "microsoft azure": ["azure"],
+    "machine learning": ["ml"],
+    "deep learning": ["dl"],
+    "artificial intelligence": ["ai"],
+    "natural language processing": ["nlp"],
+    "large language models": ["llm", "llms"],
+    "c++": ["cpp"],
+    "c#": ["csharp", "c sharp"],
+    ".net": ["dotnet", "dot net"],
+    "golang": ["go lang"],
+    "python": ["python3", "python 3"],
+    "html": ["html5"],
+    "css": ["css3"],
+    "rest api": ["restful api", "restful apis", "rest apis", "restful services"],
+    "ci/cd": ["cicd", "ci cd", "continuous integration", "continuous delivery"],
+    "object oriented programming": ["oop", "oops"],
+    "data structures and algorithms": ["dsa", "data structures & algorithms"],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "tensorflow": ["tensor flow"],
+    "power bi": ["powerbi"],
+    "git": ["github", "gitlab"],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*|\.[a-z][a-z0-9]*")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"(?:\+?\d[\d\s().-]{8,}\d)")
+
+SECTION_HEADINGS = {
+    "experience": ["experience", "employment", "work history", "internship", "internships"],
+    "education": ["education", "academic", "qualification", "qualifications"],
+    "skills": ["skills", "technical skills", "technologies", "tech stack"],
+    "projects": ["projects", "project"],
+}
+
+MAX_PHRASE_TOKENS = 5
+
+
+def _stem(token):
+    """Light suffix stemmer; leaves short and non-alphabetic tokens alone."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("es") and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+
+    if token.endswith("ing") and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith("ed") and len(token) > 4:
+        token = token[:-2]
+
+    if token.endswith("e") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-case ``text`` and split it into stemmed tokens."""
+    tokens = []
+    for raw in _TOKEN_RE.findall((text or "").lower()):
+        token = raw.rstrip("./")
+        if token:
+            tokens.append(_stem(token))
+    return tokens
+
+
+def _build_alias_table():
+    table = {}
+    for canonical, aliases in SKILL_SYNONYMS.items():
+        canonical_tokens = tuple(tokenize(canonical))
+        for alias in [canonical, *aliases]:
+            alias_tokens = tuple(tokenize(alias))
+            if alias_tokens:
+                table[alias_tokens] = canonical_tokens
+    return table
+
+
+_ALIASES = _build_alias_table()
+
+
+def canonical_tokens(text):
+    """Tokenize ``text`` and fold synonym phrases onto their canonical tokens."""
+    tokens = tokenize(text)
+    result = []
+    i = 0
+    while i < len(tokens):
+        for size in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+            replacement = _ALIASES.get(tuple(tokens[i:i + size]))
+            if replacement is not None:
+                result.extend(replacement)
+                i += size
+                break
+        else:
+            result.append(tokens[i])
+            i += 1
+    return result
+
+
+def _ngrams(tokens, max_size):
+    grams = set()
+    for size in range(1, max_size + 1):
+        for i in range(len(tokens) - size + 1):
+            grams.add(tuple(tokens[i:i + size]))
+    return grams
+
+
+def match_keywords(resume_text, keywords):
+    """
+    Split keywords into those present in the resume and those missing.
+
+    Keywords are de-duplicated by canonical form; the first spelling seen is
+    the one reported.
+    """
+    unique = []
+    seen = set()
+    for keyword in keywords or []:
+        if not isinstance(keyword, str):
+            continue
+        key = tuple(canonical_tokens(keyword))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append((keyword.strip(), key))
+
+    longest = max((len(key) for _, key in unique), default=1)
+    resume_grams = _ngrams(canonical_tokens(resume_text), longest)
+
+    matched = [keyword for keyword, key in unique if key in resume_grams]
+    missing = [keyword for keyword, key in unique if key not in resume_grams]
+    return matched, missing
+
+
+def check_formatting(resume_text):
+    """Heuristic checks for problems ATS parsers commonly trip on."""
+    text = resume_text or ""
+    issues = []
+
+    words = text.split()
+    if not words:
+        return ["No machine-readable text found (the PDF may be a scanned image)"]
+    if len(words) < 150:
+        issues.append("Resume is very short; ATS ranking favours fuller descriptions")
+    elif len(words) > 1200:
+        issues.append("Resume is long; keep it to one or two pages")
+
+    if not _EMAIL_RE.search(text):
+        issues.append("No email address detected")
+    if not _PHONE_RE.search(text):
+        issues.append("No phone number detected")
+
+    lowered = text.lower()
+    missing_sections = [
+        section for section, headings in SECTION_HEADINGS.items()
+        if not any(heading in lowered for heading in headings)
+    ]
+    if missing_sections:
+        issues.append(
+            "Missing standard section headings: " + ", ".join(missing_sections)
+        )
+
+    unusual = sum(1 for ch in text if not (ch.isascii() or ch.isspace()))
+    if unusual / max(len(text), 1) > 0.05:
+        issues.append("Many non-standard characters; avoid icons, symbols and decorative fonts")
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    if lines and sum(1 for line in lines if len(line.split()) <= 2) / len(lines) > 0.6:
+        issues.append("Text extracts as fragments; tables or multi-column layouts may confuse ATS parsers")
+
+    return issues
+
+
+_ISSUE_SUGGESTIONS = {
+    "No email": "Add a plain-text email address in the header",
+    "No phone": "Add a phone number in the header",
+    "Missing standard": "Use standard section headings such as Experience, Education, Skills and Projects",
+    "Many non-standard": "Replace icons and symbols with plain text",
+    "Text extracts": "Use a single-column layout without tables or text boxes",
+    "Resume is very short": "Describe projects and experience with concrete outcomes",
+    "Resume is long": "Trim older or less relevant content",
+    "No machine-readable": "Export the resume as a text-based PDF instead of a scan",
+}
+
+
+def score_resume(resume_text, job_keywords):
+    """
+    Compute an ATS analysis locally.
+
+    Returns:
+        dict: ats_score, keyword_match_percentage, matched_keywords,
+        missing_keywords, formatting_issues, suggestions, overall_assessment
+    """
+    matched, missing = match_keywords(resume_text, job_keywords)
+    total = len(matched) + len(missing)
+    keyword_pct = round(100 * len(matched) / total) if total else 100
+
+    issues = check_formatting(resume_text)
+    formatting_score = max(0, 100 - 15 * len(issues))
+    ats_score = round(0.7 * keyword_pct + 0.3 * formatting_score)
+
+    suggestions = []
+    if missing:
+        suggestions.append(
+            "Add evidence of these job keywords where truthful: " + ", ".join(missing[:8])
+        )
+    for issue in issues:
+        for prefix, suggestion in _ISSUE_SUGGESTIONS.items():
+            if issue.startswith(prefix):
+                suggestions.append(suggestion)
+                break
+
+    if ats_score >= 75:
+        assessment = "Good"
+    elif ats_score >= 50:
+        assessment = "Fair"
+    else:
+        assessment = "Poor"
+
+    return {
+        "ats_score": ats_score,
+        "keyword_match_percentage": keyword_pct,
+        "matched_keywords": matched,
+        "missing_keywords": missing,
+        "formatting_issues": issues,
+        "suggestions": suggestions,
+        "overall_assessment": assessment,
+    }
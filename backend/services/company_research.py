@@ -1,12 +1,32 @@
+import hashlib
+import heapq
+import itertools
 import json
-import os
+import re
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 
-import openai
+from sqlalchemy import func, or_
 
-from models import Company, db
+from models import Company, PlacementDrive, db
+from services.openai_client import create_chat_completion, create_response
+from services.rate_governor import waiting_callers
+from services.single_flight import single_flight
+from utils.metrics import (
+    company_refresh_queue_depth,
+    company_refreshes_total,
+    company_stale_served_total,
+    track_stage,
+)
 
-GENERAL_COMPANY_KEYS = [
+# Longer than deep research (600s) plus the fallback, so a live run is never taken over
+RESEARCH_LEASE_SECONDS = 900
+
+COMPANY_SUFFIXES = {"inc", "incorporated", "ltd", "limited", "llc", "llp", "pvt", "private", "corp", "corporation", "co", "plc"}
+
+# Company-level facts from deep research, cached on Company.research_data
+COMPANY_FACT_KEYS = [
     "company_overview",
     "industry",
     "company_size",
@@ -15,7 +35,21 @@ GENERAL_COMPANY_KEYS = [
     "recent_news",
     "work_environment",
     "key_facts",
+    "source_notes",
 ]
+COMPANY_FACTS_MAX_AGE = timedelta(days=7)
+
+# Background refreshes: a priority queue (earliest drive first) drained by a
+# bounded set of worker threads, plus a periodic scan of active drives
+_refresh_queue = []  # heap of (priority, seq, key, name, website, max_age, trigger)
+_refresh_pending = {}  # key -> priority of its live heap entry
+_refresh_running = set()
+_refresh_ready = threading.Condition()
+_refresh_seq = itertools.count()
+_refresh_threads = []
+
+# Seconds between checks while interactive LLM callers are queued
+REFRESH_YIELD_SECONDS = 1.0
 
 
 def _parse_response_json(response):
@@ -48,7 +82,37 @@ def _parse_response_json(response):
     return json.loads(response_text)
 
 
-def _fallback_company_research(client, company_name, company_website):
+def _unavailable_facts(company_name):
+    return {
+        "company_overview": f"Research data unavailable for {company_name}",
+        "industry": "Unknown",
+        "company_size": "Unknown",
+        "culture_values": [],
+        "tech_stack": [],
+        "recent_news": [],
+        "work_environment": "Unknown",
+        "key_facts": [],
+        "source_notes": [],
+    }
+
+
+def _empty_role_delta():
+    return {
+        "role_insights": {
+            "role_summary": "Unknown",
+            "key_responsibilities": [],
+            "success_profile": [],
+            "emerging_trends": [],
+        },
+        "tailoring_recommendations": {
+            "resume_focus": [],
+            "culture_alignment": [],
+            "project_highlights": [],
+        },
+    }
+
+
+def _fallback_company_research(company_name, company_website):
     """Use standard GPT-4 completion when deep research is unavailable."""
     prompt = f"""Research the company "{company_name}" {f'(website: {company_website})' if company_website else ''}.
 
@@ -61,23 +125,13 @@ Provide a comprehensive analysis in the following JSON format:
     "tech_stack": ["tech1", "tech2", "tech3"],
     "recent_news": ["news1", "news2"],
     "work_environment": "Description of work culture",
-    "key_facts": ["fact1", "fact2", "fact3"],
-    "role_insights": {{
-        "role_summary": "Unknown",
-        "key_responsibilities": [],
-        "success_profile": [],
-        "emerging_trends": []
-    }},
-    "tailoring_recommendations": {{
-        "resume_focus": [],
-        "culture_alignment": [],
-        "project_highlights": []
-    }}
+    "key_facts": ["fact1", "fact2", "fact3"]
 }}
 
 Focus on information relevant for job seekers. Use "Unknown" or empty arrays if information is not available."""
 
-    fallback = client.chat.completions.create(
+    fallback = create_chat_completion(
+        "research_company_fallback",
         model="gpt-4o",
         messages=[
             {
@@ -93,42 +147,34 @@ Focus on information relevant for job seekers. Use "Unknown" or empty arrays if
     return _parse_response_json(fallback)
 
 
-def research_company(
-    company_name,
-    company_website=None,
-    job_title=None,
-    job_description=None,
-    student_profile=None,
-):
-    """
-    Deep research on company and targeted role using OpenAI Deep Research.
-    Returns: dict with company insights and role-tailored recommendations.
-    """
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def normalize_company_name(name):
+    """Lowercase, punctuation-free company name without legal suffixes ("Acme Pvt. Ltd." -> "acme")."""
+    words = re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).split()
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
 
-    cached_general = None
-    company = Company.query.filter_by(name=company_name).first()
+
+def cached_company_facts(company, max_age=COMPANY_FACTS_MAX_AGE):
+    """The company's stored research if younger than ``max_age``, else None."""
     if (
         company
         and company.research_data
         and company.last_researched
         and datetime.now(timezone.utc)
         - company.last_researched.replace(tzinfo=timezone.utc)
-        < timedelta(days=7)
+        < max_age
     ):
-        cached_general = company.research_data
+        return company.research_data
+    return None
+
 
-    prompt = f"""You are an elite career intelligence analyst conducting exhaustive research for a student preparing to apply.
+def _deep_research_company(company_name, company_website):
+    """Run deep research on the company itself and store the facts on its Company row."""
+    prompt = f"""You are an elite career intelligence analyst conducting exhaustive research on a company that students are applying to.
 
 Company: {company_name}
 Website: {company_website or 'Unknown'}
-Target Role: {job_title or 'Not specified'}
-
-Job Description:
-{job_description or 'Not provided'}
-
-Student Profile Snapshot (for tailoring suggestions):
-{json.dumps(student_profile or {}, indent=2)}
 
 Deliver a comprehensive, factual report using any reputable sources you can find. Structure the final answer strictly as JSON:
 {{
@@ -140,27 +186,16 @@ Deliver a comprehensive, factual report using any reputable sources you can find
     "recent_news": ["Important headlines or initiatives from the last 6-12 months"],
     "work_environment": "Description of work culture and collaboration style",
     "key_facts": ["3-5 bullet facts that impress recruiters (awards, growth, customers, etc.)"],
-    "role_insights": {{
-        "role_summary": "One paragraph explaining what this role is expected to accomplish.",
-        "key_responsibilities": ["Concrete responsibilities the role will own"],
-        "success_profile": ["Traits or behaviours top performers share"],
-        "emerging_trends": ["Market / industry shifts impacting this role right now"]
-    }},
-    "tailoring_recommendations": {{
-        "resume_focus": ["Specific angles this student should emphasize in their resume"],
-        "culture_alignment": ["Talking points to show cultural fit"],
-        "project_highlights": ["Existing experience or portfolio pieces to spotlight"]
-    }},
     "source_notes": ["Short list of sources consulted, if available"]
 }}
 
 Return valid JSON only. If credible data cannot be found for any field, use "Unknown" or an empty list."""
 
-    research_data = None
-
+    facts = None
     try:
         # Use OpenAI SDK's responses.create() for deep research with web search
-        response = client.responses.create(
+        response = create_response(
+            "research_company",
             model="o4-mini-deep-research",
             input=prompt,  # Simple string input per Deep Research API docs
             tools=[{"type": "web_search_preview"}],
@@ -168,62 +203,282 @@ Return valid JSON only. If credible data cannot be found for any field, use "Unk
             temperature=0.4,
             timeout=600,
         )
-        research_data = _parse_response_json(response)
+        facts = _parse_response_json(response)
     except Exception as deep_error:
         print(f"Deep research error: {deep_error}")
 
-    if not research_data:
+    if not facts:
         try:
-            research_data = _fallback_company_research(
-                client, company_name, company_website
-            )
+            facts = _fallback_company_research(company_name, company_website)
         except Exception as fallback_error:
             print(f"Company research fallback error: {fallback_error}")
-            research_data = {
-                "company_overview": f"Research data unavailable for {company_name}",
-                "industry": "Unknown",
-                "company_size": "Unknown",
-                "culture_values": [],
-                "tech_stack": [],
-                "recent_news": [],
-                "work_environment": "Unknown",
-                "key_facts": [],
-                "role_insights": {
-                    "role_summary": "Unknown",
-                    "key_responsibilities": [],
-                    "success_profile": [],
-                    "emerging_trends": [],
-                },
-                "tailoring_recommendations": {
-                    "resume_focus": [],
-                    "culture_alignment": [],
-                    "project_highlights": [],
-                },
-                "source_notes": [],
-            }
-
-    if cached_general:
-        # Preserve cached general fields when available to ensure consistency.
-        for key in GENERAL_COMPANY_KEYS:
-            if key in cached_general and cached_general[key]:
-                research_data[key] = cached_general[key]
+            # Not stored, so the next request researches again
+            return _unavailable_facts(company_name)
 
-    # Cache general company data for reuse (exclude job-specific tailoring)
+    facts = {key: facts.get(key) for key in COMPANY_FACT_KEYS}
+    company = Company.query.filter_by(name=company_name).first()
     if company:
-        general_payload = {key: research_data.get(key) for key in GENERAL_COMPANY_KEYS}
-        company.research_data = general_payload
+        company.research_data = facts
         company.last_researched = datetime.now(timezone.utc)
         db.session.commit()
+    return facts
+
+
+def refresh_company_facts(company_name, company_website=None, max_age=COMPANY_FACTS_MAX_AGE):
+    """
+    Research the company unless its cached facts are younger than ``max_age``;
+    one run is shared by all concurrent callers (across threads and worker
+    processes).
+    """
+    def research():
+        # Another process may have finished the research while we waited for the lock
+        cached = cached_company_facts(Company.query.filter_by(name=company_name).first(), max_age)
+        return cached or _deep_research_company(company_name, company_website)
+
+    return single_flight(
+        f"company_research:{normalize_company_name(company_name)[:200]}",
+        research,
+        lease_seconds=RESEARCH_LEASE_SECONDS,
+        wait_seconds=RESEARCH_LEASE_SECONDS + 60,
+    )
+
+
+def get_company_facts(company_name, company_website=None):
+    """
+    General facts about a company, served from Company.research_data.
+
+    Stale facts are returned as they are while a background refresh is
+    queued (stale-while-revalidate); only a company never researched, or a
+    process without refresh workers, waits for deep research inline.
+    """
+    company = Company.query.filter_by(name=company_name).first()
+    cached = cached_company_facts(company)
+    if cached:
+        return cached
+
+    if company and company.research_data and schedule_company_refresh(company_name, company_website):
+        company_stale_served_total.inc()
+        return company.research_data
+
+    return refresh_company_facts(company_name, company_website)
+
+
+def schedule_company_refresh(company_name, company_website=None, priority=None,
+                             max_age=COMPANY_FACTS_MAX_AGE, trigger='stale'):
+    """
+    Queue a background research refresh; lower ``priority`` runs first and
+    defaults to now (as urgent as a drive happening today).
+
+    Returns:
+        bool: False when this process runs no refresh workers.
+    """
+    if not _refresh_threads:
+        return False
+    key = normalize_company_name(company_name)
+    priority = time.time() if priority is None else priority
+    with _refresh_ready:
+        if key in _refresh_running or (key in _refresh_pending and _refresh_pending[key] <= priority):
+            return True
+        # A more urgent entry supersedes the queued one, which is skipped when popped
+        _refresh_pending[key] = priority
+        heapq.heappush(
+            _refresh_queue,
+            (priority, next(_refresh_seq), key, company_name, company_website, max_age, trigger),
+        )
+        company_refresh_queue_depth.set(len(_refresh_pending))
+        _refresh_ready.notify()
+    return True
+
+
+def schedule_due_refreshes(ahead_seconds, limit):
+    """
+    Queue refreshes for companies with active drives whose facts expire
+    within ``ahead_seconds``, earliest upcoming drive first.
+
+    Returns:
+        int: number of companies queued.
+    """
+    max_age = COMPANY_FACTS_MAX_AGE - timedelta(seconds=ahead_seconds)
+    next_drive = func.min(PlacementDrive.drive_date)
+    rows = (
+        db.session.query(Company.name, Company.website, next_drive.label('next_drive'))
+        .join(PlacementDrive, PlacementDrive.company_id == Company.id)
+        .filter(PlacementDrive.status == 'active')
+        .filter(or_(
+            Company.last_researched.is_(None),
+            Company.last_researched < datetime.utcnow() - max_age,
+        ))
+        .group_by(Company.id, Company.name, Company.website)
+        .order_by(next_drive.is_(None), next_drive)
+        .limit(limit)
+        .all()
+    )
+    for row in rows:
+        # Drives without a date go after every dated one
+        priority = row.next_drive.replace(tzinfo=timezone.utc).timestamp() if row.next_drive else float('inf')
+        schedule_company_refresh(row.name, row.website, priority, max_age, trigger='scheduled')
+    return len(rows)
+
+
+def _next_refresh():
+    with _refresh_ready:
+        while True:
+            while _refresh_queue:
+                priority, _, key, name, website, max_age, trigger = heapq.heappop(_refresh_queue)
+                if _refresh_pending.get(key) != priority:
+                    continue  # superseded by a more urgent entry
+                del _refresh_pending[key]
+                _refresh_running.add(key)
+                company_refresh_queue_depth.set(len(_refresh_pending))
+                return key, name, website, max_age, trigger
+            _refresh_ready.wait()
+
+
+def _refresh_worker(app):
+    while True:
+        key, name, website, max_age, trigger = _next_refresh()
+        try:
+            # Interactive callers waiting for LLM rate budget go first
+            while waiting_callers():
+                time.sleep(REFRESH_YIELD_SECONDS)
+            with app.app_context():
+                refresh_company_facts(name, website, max_age)
+            company_refreshes_total.inc(trigger)
+        except Exception as e:
+            print(f"Company research refresh error ({name}): {e}")
+        finally:
+            with _refresh_ready:
+                _refresh_running.discard(key)
+
+
+def _refresh_scheduler(app):
+    while True:
+        try:
+            with app.app_context():
+                schedule_due_refreshes(
+                    app.config['RESEARCH_REFRESH_AHEAD_SECONDS'],
+                    app.config['RESEARCH_REFRESH_BATCH_SIZE'],
+                )
+        except Exception as e:
+            print(f"Company research scheduler error: {e}")
+        time.sleep(app.config['RESEARCH_REFRESH_SCAN_SECONDS'])
+
+
+def start_research_refresher(app):
+    """Start the background workers that keep company research fresh."""
+    count = app.config.get('RESEARCH_REFRESH_WORKERS', 0)
+    if _refresh_threads or count <= 0:
+        return
+
+    for index in range(count):
+        worker = threading.Thread(
+            target=_refresh_worker,
+            args=(app,),
+            name=f"research-refresh-{index}",
+            daemon=True,
+        )
+        worker.start()
+        _refresh_threads.append(worker)
+
+    scheduler = threading.Thread(
+        target=_refresh_scheduler,
+        args=(app,),
+        name="research-refresh-scheduler",
+        daemon=True,
+    )
+    scheduler.start()
+    _refresh_threads.append(scheduler)
+
+
+@track_stage('research_role_delta')
+def research_role_delta(company_facts, job_title=None, job_description=None, student_profile=None):
+    """Role insights and tailoring advice derived from known company facts with a small, fast model."""
+    prompt = f"""Using the company facts below, explain the target role and how this student should tailor their application.
+
+Company Facts:
+{json.dumps(company_facts, indent=2)}
+
+Target Role: {job_title or 'Not specified'}
+
+Job Description:
+{job_description or 'Not provided'}
+
+Student Profile Snapshot (for tailoring suggestions):
+{json.dumps(student_profile or {}, indent=2)}
+
+Return JSON:
+{{
+    "role_insights": {{
+        "role_summary": "One paragraph explaining what this role is expected to accomplish.",
+        "key_responsibilities": ["Concrete responsibilities the role will own"],
+        "success_profile": ["Traits or behaviours top performers share"],
+        "emerging_trends": ["Market / industry shifts impacting this role right now"]
+    }},
+    "tailoring_recommendations": {{
+        "resume_focus": ["Specific angles this student should emphasize in their resume"],
+        "culture_alignment": ["Talking points to show cultural fit"],
+        "project_highlights": ["Existing experience or portfolio pieces to spotlight"]
+    }}
+}}
 
+Base every point on the facts and job description given; use "Unknown" or empty lists rather than guessing."""
+
+    try:
+        response = create_chat_completion(
+            "research_role_delta",
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are a career coach preparing college students for placement interviews."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=1200,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+        delta = _parse_response_json(response)
+        empty = _empty_role_delta()
+        return {key: delta.get(key) or empty[key] for key in empty}
+    except Exception as error:
+        print(f"Role research error: {error}")
+        return None
+
+
+@track_stage('research_company')
+def research_company(
+    company_name,
+    company_website=None,
+    job_title=None,
+    job_description=None,
+    student_profile=None,
+):
+    """
+    Company insights plus role-tailored recommendations.
+
+    Company facts come from the Company cache while fresh (deep research runs
+    only when they are missing or stale); the role- and student-specific
+    parts are generated on top of them by a small model.
+    Returns: dict with company insights and role-tailored recommendations.
+    """
+    return tailor_company_research(
+        get_company_facts(company_name, company_website), job_title, job_description, student_profile
+    )
+
+
+def tailor_company_research(company_facts, job_title=None, job_description=None, student_profile=None):
+    """Company facts merged with the role insights and tailoring advice for a student."""
+    research_data = dict(company_facts)
+    research_data.update(
+        research_role_delta(research_data, job_title, job_description, student_profile)
+        or _empty_role_delta()
+    )
     return research_data
 
 
+@track_stage('analyze_job_requirements')
 def analyze_job_requirements(job_description, job_requirements):
     """
     Extract and analyze key requirements from job posting
     """
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     prompt = f"""Analyze this job posting and extract key requirements:
 
 Job Description:
@@ -244,7 +499,8 @@ Provide analysis in JSON format:
 
     # Use Chat Completions API with GPT-4o (supports JSON mode)
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "analyze_job_requirements",
             model="gpt-4o",
             messages=[
                 {
@@ -262,3 +518,38 @@ Provide analysis in JSON format:
     except Exception as error:
         print(f"Job analysis error: {error}")
         return None
+
+
+def job_analysis_fingerprint(job_description, job_requirements):
+    """Stable hash of the inputs that determine a drive's job analysis."""
+    payload = json.dumps(
+        {"description": job_description or "", "requirements": job_requirements or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ensure_drive_job_analysis(drive):
+    """
+    Return the drive's stored job analysis, re-running the AI analysis only
+    when the job description or requirements changed since the last run.
+    """
+    fingerprint = job_analysis_fingerprint(drive.job_description, drive.job_requirements)
+    if drive.job_analysis and drive.job_analysis_hash == fingerprint:
+        return drive.job_analysis
+
+    try:
+        job_analysis = analyze_job_requirements(
+            drive.job_description, drive.job_requirements or {}
+        )
+    except Exception as error:
+        print(f"Job analysis error: {error}")
+        return None
+
+    if job_analysis:
+        drive.job_analysis = job_analysis
+        drive.job_analysis_hash = fingerprint
+        drive.job_analysis_version = (drive.job_analysis_version or 0) + 1
+        db.session.commit()
+
+    return job_analysis
@@ -0,0 +1,203 @@
+"""
+Drive warm-up: precompute what student interactions with a drive need as
+soon as a TPO creates or edits it, instead of on the first student request.
+
+enqueue_drive_warmup() marks the drive 'queued' in the caller's session, so
+the warm-up is committed together with the drive. Background workers claim
+queued drives with a conditional UPDATE (as the analysis job queue does),
+analyze the job requirements, research the company and build the drive's
+skill vocabulary. An edit while a warm-up runs queues the drive again and
+the outdated result is discarded. With no warm-up workers configured the
+drive is marked 'disabled' instead of waiting in the queue.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, update
+
+from models import PlacementDrive, db
+from services.applicant_ranking import build_skill_vocabulary
+from services.company_research import cached_company_facts, ensure_drive_job_analysis, refresh_company_facts
+
+_wakeup = threading.Event()
+_workers = []
+
+
+class WarmupError(Exception):
+    """A warm-up step produced no result; the message is shown on the drive."""
+
+
+def enqueue_drive_warmup(drive):
+    """
+    Queue a warm-up of ``drive`` in the current session (committed by the
+    caller). With DRIVE_WARMUP_WORKERS=0 nothing would run it, so the drive
+    is marked 'disabled' and analyzed on first use instead.
+    """
+    drive.warmup_requested_at = datetime.utcnow()
+    drive.warmup_error = None
+    if current_app.config['DRIVE_WARMUP_WORKERS'] <= 0:
+        drive.warmup_status = 'disabled'
+        return
+
+    drive.warmup_status = 'queued'
+    db.session.info['drive_warmup_queued'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop('drive_warmup_queued', False):
+        _wakeup.set()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_queued(session):
+    session.info.pop('drive_warmup_queued', None)
+
+
+def serialize_warmup(drive):
+    """Readiness of a drive's precomputed analysis, research and vocabulary."""
+    return {
+        'status': drive.warmup_status,
+        'error': drive.warmup_error,
+        'requested_at': drive.warmup_requested_at.isoformat() if drive.warmup_requested_at else None,
+        'warmed_at': drive.warmed_at.isoformat() if drive.warmed_at else None,
+    }
+
+
+def _requeue_stale(app):
+    """Queue again drives whose warm-up worker stopped before finishing."""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['DRIVE_WARMUP_STALE_SECONDS'])
+    db.session.execute(
+        update(PlacementDrive)
+        .where(PlacementDrive.warmup_status == 'running', PlacementDrive.warmup_started_at < cutoff)
+        .values(warmup_status='queued')
+    )
+    db.session.commit()
+
+
+def _claim_next_drive():
+    """
+    Atomically move the longest-waiting queued drive to running.
+
+    Returns:
+        tuple: (drive, started_at), or (None, None) when nothing is queued.
+    """
+    candidates = (
+        db.session.query(PlacementDrive.id)
+        .filter(PlacementDrive.warmup_status == 'queued')
+        .order_by(PlacementDrive.warmup_requested_at, PlacementDrive.id)
+        .limit(5)
+        .all()
+    )
+    for (drive_id,) in candidates:
+        started_at = datetime.utcnow()
+        claimed = db.session.execute(
+            update(PlacementDrive)
+            .where(PlacementDrive.id == drive_id, PlacementDrive.warmup_status == 'queued')
+            .values(warmup_status='running', warmup_started_at=started_at)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(PlacementDrive, drive_id), started_at
+    return None, None
+
+
+def warm_drive(drive):
+    """
+    Run every warm-up step for ``drive``.
+
+    Returns:
+        dict: the skill vocabulary to store, tagged with the analysis it was built from.
+    """
+    job_analysis = ensure_drive_job_analysis(drive)
+    if not job_analysis:
+        raise WarmupError('Could not analyze job requirements')
+
+    company = drive.company
+    if company is not None:
+        refresh_company_facts(company.name, company.website)
+        db.session.refresh(company)
+        if not cached_company_facts(company):
+            raise WarmupError('Company research unavailable')
+
+    vocabulary = build_skill_vocabulary(job_analysis, drive.job_requirements)
+    return {
+        'analysis_version': drive.job_analysis_version,
+        'analysis_hash': drive.job_analysis_hash,
+        'terms': [dict(entry, tokens=list(entry['tokens'])) for entry in vocabulary],
+    }
+
+
+def _finish(drive_id, started_at, **values):
+    # Only the warm-up still owning the drive records its outcome
+    db.session.execute(
+        update(PlacementDrive)
+        .where(
+            PlacementDrive.id == drive_id,
+            PlacementDrive.warmup_status == 'running',
+            PlacementDrive.warmup_started_at == started_at,
+        )
+        .values(**values)
+    )
+    db.session.commit()
+
+
+def _process_drive(drive, started_at):
+    drive_id = drive.id
+    try:
+        vocabulary = warm_drive(drive)
+    except WarmupError as e:
+        _finish(drive_id, started_at, warmup_status='failed', warmup_error=str(e))
+        return
+    except Exception as e:
+        db.session.rollback()
+        print(f"Drive warm-up {drive_id} error: {e}")
+        _finish(drive_id, started_at, warmup_status='failed', warmup_error='Warm-up failed')
+        return
+
+    _finish(
+        drive_id,
+        started_at,
+        warmup_status='ready',
+        warmup_error=None,
+        skill_vocabulary=vocabulary,
+        warmed_at=datetime.utcnow(),
+    )
+
+
+def _worker_loop(app, worker_id):
+    poll_seconds = app.config['DRIVE_WARMUP_POLL_SECONDS']
+    while True:
+        try:
+            with app.app_context():
+                _requeue_stale(app)
+                drive, started_at = _claim_next_drive()
+                if drive is not None:
+                    _process_drive(drive, started_at)
+                    continue
+        except Exception as e:
+            print(f"Drive warm-up worker {worker_id} error: {e}")
+
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+
+
+def start_drive_warmup_workers(app):
+    """Start the in-process workers that warm queued drives."""
+    count = app.config.get('DRIVE_WARMUP_WORKERS', 0)
+    if _workers or count <= 0:
+        return
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for index in range(count):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(app, f"{prefix}:warmup-{index}"),
+            name=f"drive-warmup-{index}",
+            daemon=True,
+        )
+        worker.start()
+        _workers.append(worker)
@@ -0,0 +1,89 @@
+"""
+Compile PlacementDrive.eligibility_criteria into SQL predicates.
+
+Each supported criteria key has a rule that receives the student and the
+drive's JSON value for that key and returns a SQLAlchemy expression that is
+true when the student satisfies it. A drive that does not set a key (or sets
+it to null) places no restriction. Keys without a rule are ignored, as they
+were by the previous Python filter.
+
+To support a new key (for example a backlog limit), register a rule:
+
+    @eligibility_rule('max_backlogs')
+    def _max_backlogs(student, criterion):
+        return or_(criterion.as_integer().is_(None),
+                   criterion.as_integer() >= student.backlogs)
+"""
+from sqlalchemy import Boolean, and_, exists, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from models import Application, PlacementDrive
+
+ELIGIBILITY_RULES = {}
+
+
+def eligibility_rule(key):
+    """Register a predicate compiler for an eligibility_criteria key."""
+    def register(compiler):
+        ELIGIBILITY_RULES[key] = compiler
+        return compiler
+    return register
+
+
+class json_array_has(FunctionElement):
+    """
+    True when a JSON array contains a string equal to ``value``: exact and
+    case-sensitive on every backend, like Python's ``value in array``.
+    """
+    type = Boolean()
+    name = 'json_array_has'
+    inherit_cache = True
+
+
+@compiles(json_array_has, 'postgresql')
+def _json_array_has_postgresql(element, compiler, **kw):
+    array, value = element.clauses
+    return (
+        f"CAST({compiler.process(array, **kw)} AS JSONB) "
+        f"@> jsonb_build_array(CAST({compiler.process(value, **kw)} AS TEXT))"
+    )
+
+
+@compiles(json_array_has, 'sqlite')
+def _json_array_has_sqlite(element, compiler, **kw):
+    array, value = element.clauses
+    return (
+        f"EXISTS (SELECT 1 FROM json_each({compiler.process(array, **kw)}) "
+        f"WHERE json_each.value = {compiler.process(value, **kw)})"
+    )
+
+
+@eligibility_rule('min_cgpa')
+def _min_cgpa(student, criterion):
+    minimum = criterion.as_float()
+    if student.cgpa is None:
+        # Students without a CGPA only qualify for drives without a minimum.
+        return minimum.is_(None)
+    return or_(minimum.is_(None), minimum <= student.cgpa)
+
+
+@eligibility_rule('departments')
+def _departments(student, criterion):
+    return or_(criterion.as_string().is_(None), json_array_has(criterion, student.department))
+
+
+def compile_eligibility(student):
+    """Return one predicate requiring the student to satisfy every rule."""
+    return and_(*[
+        compiler(student, PlacementDrive.eligibility_criteria[key])
+        for key, compiler in ELIGIBILITY_RULES.items()
+    ])
+
+
+def not_applied_by(student):
+    """Anti-join predicate: the student has no application for the drive."""
+    return ~exists().where(
+        Application.drive_id == PlacementDrive.id,
+        Application.student_id == student.id,
+    )
@@ -0,0 +1,207 @@
+"""
+Transactional email outbox.
+
+Routes call queue_email() in the same session as the status change the
+message announces, so the email is committed (or rolled back) together with
+it and no SMTP round-trip happens inside the request. A background
+dispatcher claims due messages in batches, sends each batch over one SMTP
+connection and records the outcome per message; failed sends are retried
+with exponential backoff up to EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import event, update
+
+from models import EmailOutbox, db
+
+_wakeup = threading.Event()
+_workers = []
+
+
+def queue_email(to, subject, body):
+    """
+    Add a message to the outbox in the current session (committed by the caller).
+
+    Returns:
+        EmailOutbox: the queued message, or None when there is no recipient.
+    """
+    if not to:
+        return None
+    message = EmailOutbox(recipient=to, subject=subject, body=body, status='pending')
+    db.session.add(message)
+    db.session.info['email_queued'] = True
+    return message
+
+
+def queue_emails(messages):
+    """Queue (to, subject, body) tuples; returns the number queued."""
+    queued = [queue_email(to, subject, body) for to, subject, body in messages]
+    return sum(1 for message in queued if message is not None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_dispatcher(session):
+    if session.info.pop('email_queued', False):
+        _wakeup.set()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_queued(session):
+    session.info.pop('email_queued', None)
+
+
+def _release_stale(app):
+    """Return messages claimed by a dispatcher that stopped before finishing."""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['EMAIL_OUTBOX_STALE_SECONDS'])
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.status == 'sending', EmailOutbox.locked_at < cutoff)
+        .values(status='pending', locked_by=None)
+    )
+    db.session.commit()
+
+
+def _claim_batch(app, worker_id):
+    """Atomically mark a batch of due messages as being sent by this worker."""
+    now = datetime.utcnow()
+    due = [
+        message_id for (message_id,) in db.session.query(EmailOutbox.id)
+        .filter(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(app.config['EMAIL_OUTBOX_BATCH_SIZE'])
+    ]
+    if not due:
+        return []
+
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due), EmailOutbox.status == 'pending')
+        .values(
+            status='sending',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=EmailOutbox.attempts + 1,
+        )
+    )
+    db.session.commit()
+
+    # Rows another dispatcher claimed first are not ours to send
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(due),
+        EmailOutbox.status == 'sending',
+        EmailOutbox.locked_by == worker_id,
+    ).order_by(EmailOutbox.id).all()
+
+
+def _record_failure(app, message, error):
+    message.last_error = str(error)[:1000]
+    message.locked_by = None
+    if message.attempts >= app.config['EMAIL_OUTBOX_MAX_ATTEMPTS']:
+        message.status = 'failed'
+    else:
+        delay = app.config['EMAIL_OUTBOX_RETRY_SECONDS'] * 2 ** (message.attempts - 1)
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+
+def _deliver(app, messages):
+    """Send claimed messages over one SMTP connection and record each outcome."""
+    counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+    mail = app.extensions.get('mail')
+    try:
+        with mail.connect() as connection:
+            for message in messages:
+                try:
+                    connection.send(Message(
+                        subject=message.subject,
+                        recipients=[message.recipient],
+                        body=message.body
+                    ))
+                    message.status = 'sent'
+                    message.sent_at = datetime.utcnow()
+                    message.last_error = None
+                    message.locked_by = None
+                except Exception as e:
+                    print(f"Email error ({message.recipient}): {e}")
+                    _record_failure(app, message, e)
+                # Persist per message so a crash mid-batch does not resend delivered mail
+                db.session.commit()
+    except Exception as e:
+        print(f"Email connection error: {e}")
+        for message in messages:
+            if message.status == 'sending':
+                _record_failure(app, message, e)
+        db.session.commit()
+
+    for message in messages:
+        if message.status == 'sent':
+            counts['sent'] += 1
+        elif message.status == 'failed':
+            counts['failed'] += 1
+        else:
+            counts['retrying'] += 1
+    return counts
+
+
+def dispatch_outbox(app, worker_id=None):
+    """
+    Send one batch of due messages.
+
+    Returns:
+        dict: number of messages sent, scheduled for retry and failed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:cli"
+    _release_stale(app)
+    messages = _claim_batch(app, worker_id)
+    if not messages:
+        return {'sent': 0, 'retrying': 0, 'failed': 0}
+    return _deliver(app, messages)
+
+
+def drain_outbox(app=None):
+    """Send batches until no message is due; returns the summed counts."""
+    app = app or current_app._get_current_object()
+    totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+    while True:
+        counts = dispatch_outbox(app)
+        for key, value in counts.items():
+            totals[key] += value
+        if not any(counts.values()):
+            return totals
+
+
+def _worker_loop(app, worker_id):
+    poll_seconds = app.config['EMAIL_OUTBOX_POLL_SECONDS']
+    while True:
+        try:
+            with app.app_context():
+                if any(dispatch_outbox(app, worker_id).values()):
+                    continue
+        except Exception as e:
+            print(f"Email dispatcher {worker_id} error: {e}")
+
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+
+
+def start_email_dispatcher(app):
+    """Start the in-process threads that drain the email outbox."""
+    count = app.config.get('EMAIL_OUTBOX_WORKERS', 0)
+    if _workers or count <= 0:
+        return
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for index in range(count):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(app, f"{prefix}:email-{index}"),
+            name=f"email-dispatcher-{index}",
+            daemon=True,
+        )
+        worker.start()
+        _workers.append(worker)
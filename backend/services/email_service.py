@@ -1,48 +1,45 @@
-from flask_mail import Message
-from flask import current_app
-import openai
-import os
+import json
 
-def send_email_notification(to, subject, body):
-    """Send email notification"""
-    try:
-        # Get mail instance from app extensions
-        mail = current_app.extensions.get('mail')
+from services.openai_client import create_chat_completion
+from utils.metrics import track_stage
 
-        msg = Message(
-            subject=subject,
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[to]
-        )
-        msg.body = body
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Email error: {e}")
-        return False
+@track_stage('generate_ai_email_template')
+def generate_ai_email_template(purpose, context, fields):
+    """
+    Generate a reusable AI-written email with {placeholder} mail-merge fields.
 
-def generate_ai_email(context, purpose):
-    """Generate AI-powered email content using OpenAI"""
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
-    prompt = f"""Generate a professional email for the following purpose: {purpose}
+    Returns:
+        dict: {'subject': ..., 'body': ...} or None on failure
+    """
+    placeholders = ", ".join("{" + field + "}" for field in fields)
+    prompt = f"""Write a reusable email template for the following purpose: {purpose}
 
 Context: {context}
 
-Generate ONLY the email body text without subject line. Keep it professional, concise, and friendly."""
+The same template will be sent to many students. Wherever a personal or drive-specific detail belongs,
+use one of these placeholders exactly as written: {placeholders}. Address the student with {{student_name}}.
+Do not use any other curly braces.
+
+Return JSON with two keys: "subject" (one line) and "body" (plain text, no subject line).
+Keep it professional, concise, and friendly."""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "generate_ai_email_template",
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a professional email writer for a college placement system."},
                 {"role": "user", "content": prompt}
             ],
+            response_format={"type": "json_object"},
             max_tokens=500,
             temperature=0.7
         )
 
-        return response.choices[0].message.content
+        template = json.loads(response.choices[0].message.content)
+        if not isinstance(template.get('subject'), str) or not isinstance(template.get('body'), str):
+            return None
+        return {'subject': template['subject'].strip(), 'body': template['body'].strip()}
     except Exception as e:
-        print(f"AI email generation error: {e}")
+        print(f"AI email template generation error: {e}")
         return None
@@ -0,0 +1,193 @@
+"""
+Cached, versioned email templates with local mail-merge rendering.
+
+The LLM writes one template per (drive, purpose) with {placeholder} fields.
+Templates are stored in email_templates and memoized in process; a new
+version is generated only when the drive details the template was written
+from change. Every message is then rendered locally, so sending an email
+costs no LLM call. When no AI template can be produced the built-in default
+for the purpose is used.
+"""
+import hashlib
+import json
+import string
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from models import EmailTemplate, db
+from services.email_service import generate_ai_email_template
+from services.llm_ledger import llm_attribution
+
+TEMPLATE_FIELDS = ('student_name', 'job_title', 'company_name', 'ctc', 'location')
+
+# Bump to regenerate every stored template after changing the prompt
+TEMPLATE_PROMPT_VERSION = 1
+
+# Seconds to wait before asking the LLM again after a failed generation
+FALLBACK_RETRY_SECONDS = 600
+
+PURPOSES = {
+    'application_confirmation': {
+        'description': 'Application confirmation email sent to a student right after they apply to a placement drive',
+        'subject': 'Application Submitted - {job_title}',
+        'body': (
+            'Dear {student_name},\n\n'
+            'Thank you for applying for the {job_title} role at {company_name}. '
+            'Your application has been received and will be reviewed by the placement cell. '
+            'You can track its status from your dashboard.\n\n'
+            'Best regards,\nTraining & Placement Office'
+        ),
+    },
+}
+
+_templates = {}  # (drive_id, purpose) -> template dict
+_templates_lock = threading.Lock()
+_generation_locks = {}
+
+
+def template_fingerprint(drive, purpose):
+    """Hash of the inputs a drive's template is generated from."""
+    payload = json.dumps([
+        TEMPLATE_PROMPT_VERSION,
+        purpose,
+        drive.company.name if drive.company else None,
+        drive.job_title,
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def validate_template(text, required=()):
+    """True when ``text`` only uses known placeholders and includes the required ones."""
+    try:
+        names = {name for _, name, _, _ in string.Formatter().parse(text) if name is not None}
+    except ValueError:
+        return False
+    return names <= set(TEMPLATE_FIELDS) and set(required) <= names
+
+
+def email_fields(drive, student):
+    """Mail-merge values for a student's email about a drive."""
+    return {
+        'student_name': student.name,
+        'job_title': drive.job_title,
+        'company_name': drive.company.name if drive.company else 'the company',
+        'ctc': drive.ctc or 'as communicated',
+        'location': drive.location or 'to be announced',
+    }
+
+
+def _default_template(purpose):
+    return {
+        'version': 0,
+        'source': 'default',
+        'subject': PURPOSES[purpose]['subject'],
+        'body': PURPOSES[purpose]['body'],
+    }
+
+
+def _stored_template(drive_id, purpose):
+    return (
+        EmailTemplate.query
+        .filter_by(drive_id=drive_id, purpose=purpose)
+        .order_by(EmailTemplate.version.desc())
+        .first()
+    )
+
+
+def _as_dict(row):
+    return {
+        'version': row.version,
+        'source': row.source,
+        'subject': row.subject,
+        'body': row.body,
+        'input_hash': row.input_hash,
+    }
+
+
+def _generate(drive, purpose, fingerprint, latest_version):
+    context = f"{drive.job_title} at {drive.company.name if drive.company else 'a recruiting company'}"
+    with llm_attribution(drive_id=drive.id):
+        generated = generate_ai_email_template(PURPOSES[purpose]['description'], context, TEMPLATE_FIELDS)
+    if not generated or not validate_template(generated['subject']) \
+            or not validate_template(generated['body'], required=('student_name',)):
+        return None
+
+    row = EmailTemplate(
+        drive_id=drive.id,
+        purpose=purpose,
+        version=latest_version + 1,
+        subject=generated['subject'][:255],
+        body=generated['body'],
+        input_hash=fingerprint,
+        source='ai',
+    )
+    db.session.add(row)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process stored this version first; use theirs
+        db.session.rollback()
+        row = _stored_template(drive.id, purpose)
+    return _as_dict(row)
+
+
+def _is_current(template, fingerprint):
+    if not template or template.get('input_hash') != fingerprint:
+        return False
+    # A fallback to the default is only kept until it is time to retry the LLM
+    return template['source'] != 'default' or time.monotonic() < template['retry_at']
+
+
+def get_email_template(drive, purpose):
+    """
+    Return the current template for a drive and purpose, generating a new
+    version only when the drive's details have changed.
+    """
+    key = (drive.id, purpose)
+    fingerprint = template_fingerprint(drive, purpose)
+
+    cached = _templates.get(key)
+    if _is_current(cached, fingerprint):
+        return cached
+
+    with _templates_lock:
+        lock = _generation_locks.setdefault(key, threading.Lock())
+
+    # One generation per drive and purpose at a time; concurrent senders wait for it
+    with lock:
+        cached = _templates.get(key)
+        if _is_current(cached, fingerprint):
+            return cached
+
+        stored = _stored_template(drive.id, purpose)
+        if stored and stored.input_hash == fingerprint:
+            template = _as_dict(stored)
+        else:
+            template = _generate(drive, purpose, fingerprint, stored.version if stored else 0)
+            if template is None:
+                template = dict(
+                    _default_template(purpose),
+                    input_hash=fingerprint,
+                    retry_at=time.monotonic() + FALLBACK_RETRY_SECONDS,
+                )
+
+        _templates[key] = template
+        return template
+
+
+def render_email(drive, purpose, student):
+    """
+    Render a drive email for one student.
+
+    Returns:
+        tuple: (subject, body)
+    """
+    template = get_email_template(drive, purpose)
+    fields = email_fields(drive, student)
+    try:
+        return template['subject'].format_map(fields), template['body'].format_map(fields)
+    except (KeyError, ValueError, IndexError):
+        default = _default_template(purpose)
+        return default['subject'].format_map(fields), default['body'].format_map(fields)
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache of LLM responses.
+
+Responses are keyed by a SHA-256 of the call kind, model, prompt and every
+generation parameter, so only byte-identical requests share an entry. Hot
+entries are served from an in-process LRU; everything else from a local
+SQLite file shared by the worker processes on a host. How long a response
+stays valid is set per calling stage (STAGE_TTLS); stages without a TTL, such
+as creative writing at high temperature, are never cached. Both layers are
+size bounded and evict the least recently used entries.
+"""
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import llm_cache_requests_total
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+# Relative paths resolve against backend/, so every process shares one file
+# whatever its working directory (backend/data/ is git-ignored)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LLM_CACHE_PATH = os.path.join(BACKEND_DIR, os.getenv('LLM_CACHE_PATH', os.path.join('data', 'llm_cache.sqlite3')))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 20000))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 1000))
+
+DAY = 86400
+
+# Seconds a cached response stays valid, by stage; LLM_CACHE_TTLS (JSON) overrides entries
+STAGE_TTLS = {
+    'parse_resume_with_ai': 30 * DAY,
+    'analyze_job_requirements': 30 * DAY,
+    'explain_ats_score': 7 * DAY,
+    'identify_skills_gap': 7 * DAY,
+    'calculate_match_score': DAY,
+    'research_company': DAY,
+    'research_role_delta': DAY,
+}
+STAGE_TTLS.update(json.loads(os.getenv('LLM_CACHE_TTLS') or '{}'))
+
+# Parameters that do not change the response
+IGNORED_PARAMS = {'timeout', 'extra_headers', 'stream'}
+
+# Check the disk size bound every this many writes
+EVICT_EVERY = 100
+
+_memory = OrderedDict()  # key -> (expires_at, kind, payload)
+_memory_lock = threading.Lock()
+_local = threading.local()
+_writes = itertools.count(1)  # next() is atomic under the GIL
+
+
+def cache_ttl(stage):
+    return STAGE_TTLS.get(stage, 0) if LLM_CACHE_ENABLED else 0
+
+
+def cache_key(kind, params):
+    """Canonical hash of a request: call kind plus every response-affecting parameter."""
+    payload = {name: value for name, value in params.items() if name not in IGNORED_PARAMS}
+    canonical = json.dumps([kind, payload], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'pid', None) != os.getpid():
+        directory = os.path.dirname(LLM_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(LLM_CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            ' key TEXT PRIMARY KEY, stage TEXT, kind TEXT, payload TEXT,'
+            ' created_at REAL, expires_at REAL, accessed_at REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)')
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _serialize(response):
+    """(kind, text) for an SDK response model or a plain JSON dict."""
+    if isinstance(response, dict):
+        return 'json', json.dumps(response)
+    cls = type(response)
+    return f'{cls.__module__}:{cls.__qualname__}', response.model_dump_json()
+
+
+def _deserialize(kind, payload):
+    if kind == 'json':
+        return json.loads(payload)
+    module, qualname = kind.split(':', 1)
+    cls = importlib.import_module(module)
+    for part in qualname.split('.'):
+        cls = getattr(cls, part)
+    return cls.model_validate_json(payload)
+
+
+def _remember(key, expires_at, kind, payload):
+    with _memory_lock:
+        _memory[key] = (expires_at, kind, payload)
+        _memory.move_to_end(key)
+        while len(_memory) > LLM_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def get_cached(stage, key):
+    """Cached response for ``key``, or None. Counts a hit or miss for ``stage``."""
+    now = time.time()
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None and entry[0] <= now:
+            del _memory[key]
+            entry = None
+        if entry is not None:
+            _memory.move_to_end(key)
+    if entry is not None:
+        llm_cache_requests_total.inc(stage, 'memory_hit')
+        return _deserialize(entry[1], entry[2])
+
+    try:
+        conn = _connection()
+        row = conn.execute(
+            'SELECT kind, payload, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?',
+            (key, now),
+        ).fetchone()
+        if row is not None:
+            conn.execute('UPDATE llm_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            response = _deserialize(row[0], row[1])
+    except Exception as e:
+        print(f"LLM cache read error: {e}")
+        row = None
+
+    if row is None:
+        llm_cache_requests_total.inc(stage, 'miss')
+        return None
+    _remember(key, row[2], row[0], row[1])
+    llm_cache_requests_total.inc(stage, 'disk_hit')
+    return response
+
+
+def put_cached(stage, key, response, ttl):
+    """Store a response for ``ttl`` seconds, evicting the least recently used entries."""
+    now = time.time()
+    try:
+        kind, payload = _serialize(response)
+        _remember(key, now + ttl, kind, payload)
+        conn = _connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO llm_cache (key, stage, kind, payload, created_at, expires_at, accessed_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, stage, kind, payload, now, now + ttl, now),
+        )
+        if next(_writes) % EVICT_EVERY == 0:
+            evict(conn)
+    except Exception as e:
+        print(f"LLM cache write error: {e}")
+
+
+def evict(conn=None):
+    """Drop expired entries and keep at most LLM_CACHE_MAX_ENTRIES on disk."""
+    conn = conn or _connection()
+    conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+    conn.execute(
+        'DELETE FROM llm_cache WHERE key IN ('
+        ' SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+        (LLM_CACHE_MAX_ENTRIES,),
+    )
@@ -0,0 +1,222 @@
+"""
+Ledger of LLM calls: model, tokens, cost, latency, retries and cache hits
+per calling stage, attributed to the user, student and drive involved.
+
+Calls are recorded into an in-memory buffer and written to llm_call_ledger
+in batches by a background flusher, so recording never adds a DB round-trip
+to the call it measures. Attribution comes from llm_attribution(), which
+callers wrap around work done for a student or drive (the analysis pipeline
+carries it onto its stage threads) and defaults to the requesting user.
+"""
+import atexit
+import contextvars
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import case, func, insert
+
+from models import LLMCallLedger, db
+
+# USD per 1M (prompt, completion) tokens; unknown models are recorded without a cost
+MODEL_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'o4-mini-deep-research': (2.00, 8.00),
+}
+
+REPORT_GROUPS = {
+    'stage': LLMCallLedger.stage,
+    'drive': LLMCallLedger.drive_id,
+    'student': LLMCallLedger.student_id,
+    'user': LLMCallLedger.user_id,
+    'day': func.date(LLMCallLedger.created_at),
+}
+
+_attribution = contextvars.ContextVar('llm_attribution', default={})
+_buffer = []
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_settings = {'batch_size': 200, 'max_buffer': 10000}
+_flusher = None
+
+
+@contextmanager
+def llm_attribution(**ids):
+    """Attribute LLM calls made inside the block to the given user/student/drive ids."""
+    token = _attribution.set({**_attribution.get(), **{k: v for k, v in ids.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def current_attribution():
+    """Ids set by the enclosing llm_attribution() blocks, to carry onto other threads."""
+    return dict(_attribution.get())
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Dated snapshots (gpt-4o-2024-08-06) are priced like their base model
+        prices = next((p for name, p in MODEL_PRICES.items() if model and model.startswith(name + '-')), None)
+    if prices is None:
+        return None
+    return round((prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000, 6)
+
+
+def usage_tokens(usage):
+    """(prompt, completion) tokens from a chat completions or responses usage object/dict."""
+    if usage is None:
+        return 0, 0
+    get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+    prompt = get('prompt_tokens') or get('input_tokens') or 0
+    completion = get('completion_tokens') or get('output_tokens') or 0
+    return prompt, completion
+
+
+def record_llm_call(stage, model=None, usage=None, latency_ms=None, retries=0,
+                    cache_hit=False, error=None):
+    """Buffer one ledger row; it is written by the next batch flush."""
+    prompt_tokens, completion_tokens = usage_tokens(usage)
+    ids = dict(_attribution.get())
+    if has_request_context():
+        # Calls made while serving a request default to its user and /<drive_id>
+        context = g.get('auth_context')
+        if context is not None:
+            ids.setdefault('user_id', context.user_id)
+            if context.role == 'student':
+                ids.setdefault('student_id', context.profile_id)
+        if request.view_args and 'drive_id' in request.view_args:
+            ids.setdefault('drive_id', request.view_args['drive_id'])
+
+    row = {
+        'stage': stage,
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'cost_usd': None if cache_hit else estimate_cost(model, prompt_tokens, completion_tokens),
+        'latency_ms': round(latency_ms, 1) if latency_ms is not None else None,
+        'retries': retries,
+        'cache_hit': cache_hit,
+        'status': 'error' if error else 'ok',
+        'error': str(error)[:1000] if error else None,
+        'user_id': ids.get('user_id'),
+        'student_id': ids.get('student_id'),
+        'drive_id': ids.get('drive_id'),
+        'created_at': datetime.utcnow(),
+    }
+    with _buffer_lock:
+        _buffer.append(row)
+        if len(_buffer) > _settings['max_buffer']:
+            # The database is unreachable for a while; keep the newest rows
+            del _buffer[:len(_buffer) - _settings['max_buffer']]
+        full = len(_buffer) >= _settings['batch_size']
+    if full:
+        _wakeup.set()
+
+
+def flush_ledger():
+    """Write buffered rows (requires an app context); returns the number written."""
+    with _flush_lock:
+        with _buffer_lock:
+            rows = _buffer[:]
+            del _buffer[:]
+        if not rows:
+            return 0
+        try:
+            db.session.execute(insert(LLMCallLedger), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"LLM ledger flush error: {e}")
+            with _buffer_lock:
+                _buffer[:0] = rows
+            return 0
+        return len(rows)
+
+
+def _flush_loop(app, interval):
+    while True:
+        _wakeup.wait(interval)
+        _wakeup.clear()
+        try:
+            with app.app_context():
+                flush_ledger()
+        except Exception as e:
+            print(f"LLM ledger flusher error: {e}")
+
+
+def _flush_at_exit(app):
+    with app.app_context():
+        flush_ledger()
+
+
+def start_ledger_flusher(app):
+    """Start the thread that writes buffered ledger rows in batches."""
+    global _flusher
+    _settings['batch_size'] = app.config['LLM_LEDGER_BATCH_SIZE']
+    _settings['max_buffer'] = app.config['LLM_LEDGER_MAX_BUFFER']
+    if _flusher is not None:
+        return
+
+    _flusher = threading.Thread(
+        target=_flush_loop,
+        args=(app, app.config['LLM_LEDGER_FLUSH_SECONDS']),
+        name='llm-ledger-flusher',
+        daemon=True,
+    )
+    _flusher.start()
+    atexit.register(_flush_at_exit, app)
+
+
+def usage_report(group_by, start=None, end=None, stage=None):
+    """
+    Aggregate the ledger by ``group_by`` (a REPORT_GROUPS key) and stage.
+
+    Returns:
+        list: one dict per (group, stage), most expensive first.
+    """
+    flush_ledger()
+    key = REPORT_GROUPS[group_by].label('key')
+    columns = [key] if group_by == 'stage' else [key, LLMCallLedger.stage]
+    cost = func.coalesce(func.sum(LLMCallLedger.cost_usd), 0.0)
+
+    query = db.session.query(
+        *columns,
+        func.count(LLMCallLedger.id).label('calls'),
+        func.sum(LLMCallLedger.prompt_tokens).label('prompt_tokens'),
+        func.sum(LLMCallLedger.completion_tokens).label('completion_tokens'),
+        cost.label('cost_usd'),
+        func.avg(LLMCallLedger.latency_ms).label('avg_latency_ms'),
+        func.max(LLMCallLedger.latency_ms).label('max_latency_ms'),
+        func.sum(LLMCallLedger.retries).label('retries'),
+        func.sum(case((LLMCallLedger.cache_hit.is_(True), 1), else_=0)).label('cache_hits'),
+        func.sum(case((LLMCallLedger.status == 'error', 1), else_=0)).label('errors'),
+    )
+    if start is not None:
+        query = query.filter(LLMCallLedger.created_at >= start)
+    if end is not None:
+        query = query.filter(LLMCallLedger.created_at < end)
+    if stage:
+        query = query.filter(LLMCallLedger.stage == stage)
+
+    rows = query.group_by(*columns).order_by(cost.desc(), func.count(LLMCallLedger.id).desc()).all()
+    return [{
+        group_by: str(row.key) if group_by == 'day' and row.key is not None else row.key,
+        'stage': row.key if group_by == 'stage' else row.stage,
+        'calls': row.calls,
+        'prompt_tokens': int(row.prompt_tokens or 0),
+        'completion_tokens': int(row.completion_tokens or 0),
+        'cost_usd': round(float(row.cost_usd or 0), 4),
+        'avg_latency_ms': round(float(row.avg_latency_ms), 1) if row.avg_latency_ms is not None else None,
+        'max_latency_ms': row.max_latency_ms,
+        'retries': int(row.retries or 0),
+        'cache_hits': int(row.cache_hits or 0),
+        'errors': int(row.errors or 0),
+    } for row in rows]
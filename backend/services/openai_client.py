@@ -1,11 +1,57 @@
+"""
+Process-wide OpenAI clients with pooled keep-alive connections.
+
+get_openai_client() returns one SDK client per process and responses_session()
+one requests.Session, both sized by LLM_MAX_CONNECTIONS, so calls reuse warm
+TLS connections instead of opening new ones. Both honor OPENAI_API_BASE, so a
+local stand-in server can replace the API. Timeouts and retries come from
+MODEL_POLICIES, with per-call ``timeout`` still allowed. Every attempt first
+waits for budget from the shared rate governor. Stages with a cache TTL are
+answered from the LLM response cache when the identical request was made
+before.
+"""
 import json
 import os
+import threading
+import time
 
+import httpx
+import openai
 import requests
+from requests.adapters import HTTPAdapter
+
+from services.llm_cache import cache_key, cache_ttl, get_cached, put_cached
+from services.llm_ledger import record_llm_call, usage_tokens
+from services.rate_governor import RateLimitTimeout, acquire, estimate_tokens, penalize, settle
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 10))
+LLM_DEFAULT_TIMEOUT = float(os.getenv("LLM_DEFAULT_TIMEOUT", 120))
+# Retries are done here instead of inside the SDK so the ledger can count them
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+
+# Per-model overrides of the default timeout (seconds) and retry count
+MODEL_POLICIES = {
+    "gpt-3.5-turbo": {"timeout": 60},
+    "gpt-4o-mini": {"timeout": 60},
+    "gpt-4o": {"timeout": 120},
+    "gpt-4": {"timeout": 120},
+    # Deep research runs for minutes; a retry would repeat the whole (costly) run
+    "o4-mini-deep-research": {"timeout": 600, "max_retries": 0},
+}
+
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+_client = None
+_session = None
+_registry_pid = None
+_registry_lock = threading.Lock()
 
 
 class OpenAIClientError(Exception):
@@ -17,30 +63,200 @@ def _require_api_key():
         raise OpenAIClientError("OPENAI_API_KEY is not configured.")
 
 
-def call_responses_api(payload, timeout=180):
+def _check_fork():
+    """Forked workers must not share the parent's pooled sockets."""
+    global _client, _session, _registry_pid
+    if _registry_pid != os.getpid():
+        _client = None
+        _session = None
+        _registry_pid = os.getpid()
+
+
+def get_openai_client():
+    """The process-wide OpenAI SDK client (created on first use)."""
+    global _client
+    with _registry_lock:
+        _check_fork()
+        if _client is None:
+            _require_api_key()
+            _client = openai.OpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_API_BASE,
+                max_retries=0,
+                timeout=httpx.Timeout(LLM_DEFAULT_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+                    ),
+                ),
+            )
+        return _client
+
+
+def responses_session():
+    """The process-wide requests.Session used for direct Responses API calls."""
+    global _session
+    with _registry_lock:
+        _check_fork()
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_MAX_CONNECTIONS)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update({
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            })
+        return _session
+
+
+def model_policy(model):
+    """Timeout and retry count for ``model``."""
+    policy = MODEL_POLICIES.get(model)
+    if policy is None:
+        # Dated snapshots (gpt-4o-2024-08-06) share their base model's policy
+        policy = next((p for name, p in MODEL_POLICIES.items() if model and model.startswith(name + "-")), {})
+    return {
+        "timeout": policy.get("timeout", LLM_DEFAULT_TIMEOUT),
+        "max_retries": policy.get("max_retries", LLM_MAX_RETRIES),
+    }
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return min(float(response.headers.get("retry-after")), 60.0)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _retry_delay(error, attempt):
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return retry_after
+    return min(LLM_RETRY_BASE_SECONDS * 2 ** attempt, LLM_RETRY_MAX_SECONDS)
+
+
+def _cached_response(stage, kind, params):
+    """(response or None, cache key, ttl); hits are recorded in the ledger."""
+    ttl = cache_ttl(stage)
+    if not ttl:
+        return None, None, 0
+    started = time.perf_counter()
+    key = cache_key(kind, params)
+    response = get_cached(stage, key)
+    if response is not None:
+        model = response.get("model") if isinstance(response, dict) else getattr(response, "model", None)
+        record_llm_call(stage, model or params.get("model"),
+                        latency_ms=(time.perf_counter() - started) * 1000, cache_hit=True)
+    return response, key, ttl
+
+
+def _call_with_ledger(stage, kind, kwargs, call):
+    """Run an SDK call on the shared client with retries and record it in the LLM ledger."""
+    model = kwargs.get("model")
+    cached, key, ttl = _cached_response(stage, kind, kwargs)
+    if cached is not None:
+        return cached
+
+    policy = model_policy(model)
+    kwargs.setdefault("timeout", policy["timeout"])
+    estimated_tokens = estimate_tokens(kwargs)
+    started = time.perf_counter()
+    retries = 0
+    while True:
+        reservation = None
+        try:
+            reservation, _ = acquire(model, estimated_tokens)
+            response = call(get_openai_client(), kwargs)
+        except RETRYABLE_ERRORS as error:
+            settle(reservation, 0)
+            if isinstance(error, openai.RateLimitError):
+                penalize(model, _retry_after(error))
+            if retries < policy["max_retries"]:
+                time.sleep(_retry_delay(error, retries))
+                retries += 1
+                continue
+            record_llm_call(stage, model, latency_ms=(time.perf_counter() - started) * 1000,
+                            retries=retries, error=error)
+            raise
+        except Exception as error:
+            settle(reservation, 0)
+            record_llm_call(stage, model, latency_ms=(time.perf_counter() - started) * 1000,
+                            retries=retries, error=error)
+            raise
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            settle(reservation, sum(usage_tokens(usage)))
+        record_llm_call(
+            stage,
+            getattr(response, "model", None) or model,
+            usage=usage,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            retries=retries,
+        )
+        if key is not None:
+            put_cached(stage, key, response, ttl)
+        return response
+
+
+def create_chat_completion(stage, **kwargs):
+    """``chat.completions.create(**kwargs)`` on the shared client, recorded under ``stage``."""
+    return _call_with_ledger(stage, "chat", kwargs, lambda client, kw: client.chat.completions.create(**kw))
+
+
+def create_response(stage, **kwargs):
+    """``responses.create(**kwargs)`` on the shared client, recorded under ``stage``."""
+    return _call_with_ledger(stage, "responses", kwargs, lambda client, kw: client.responses.create(**kw))
+
+
+def call_responses_api(payload, timeout=None, stage="responses_api"):
     """
     Call the OpenAI Responses API directly.
 
     Args:
         payload (dict): JSON payload to send.
-        timeout (int): Request timeout in seconds.
+        timeout (int): Request timeout in seconds (defaults to the model's policy).
+        stage (str): Calling stage recorded in the LLM ledger.
 
     Returns:
         dict: Parsed JSON response from API.
     """
     _require_api_key()
+    cached, key, ttl = _cached_response(stage, "responses_api", payload)
+    if cached is not None:
+        return cached
+
     url = f"{OPENAI_API_BASE.rstrip('/')}/responses"
+    started = time.perf_counter()
+    reservation = None
     try:
-        response = requests.post(
+        reservation, _ = acquire(payload.get("model"), estimate_tokens(payload))
+        response = responses_session().post(
             url,
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
             data=json.dumps(payload),
-            timeout=timeout,
+            timeout=(LLM_CONNECT_TIMEOUT, timeout or model_policy(payload.get("model"))["timeout"]),
         )
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as exc:
+        data = response.json()
+    except (requests.RequestException, RateLimitTimeout) as exc:
+        settle(reservation, 0)
+        if getattr(exc, "response", None) is not None and exc.response.status_code == 429:
+            penalize(payload.get("model"), _retry_after(exc))
+        record_llm_call(stage, payload.get("model"), latency_ms=(time.perf_counter() - started) * 1000, error=exc)
         raise OpenAIClientError(f"OpenAI Responses API request failed: {exc}") from exc
+
+    if data.get("usage"):
+        settle(reservation, sum(usage_tokens(data["usage"])))
+    record_llm_call(
+        stage,
+        data.get("model") or payload.get("model"),
+        usage=data.get("usage"),
+        latency_ms=(time.perf_counter() - started) * 1000,
+    )
+    if key is not None:
+        put_cached(stage, key, data, ttl)
+    return data
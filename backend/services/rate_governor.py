@@ -0,0 +1,210 @@
+"""
+Per-model LLM rate governor shared by threads and worker processes.
+
+Each model configured in LLM_RATE_LIMITS has a requests-per-minute and a
+tokens-per-minute budget kept as token buckets in llm_rate_buckets, so every
+process draws from the same budget. Buckets are updated with a version-checked UPDATE (the same
+conditional-update pattern the job queues use) on a connection of their own,
+never touching the caller's session.
+
+Within a process, callers queue per model in FIFO order: only the head of
+the queue polls the bucket, and the others wait their turn instead of
+failing. A 429 from the provider empties the bucket for every process until
+the Retry-After interval has passed.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import has_app_context
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import LLMRateBucket, db
+from utils.metrics import llm_rate_limited_total, llm_rate_queue_depth, llm_rate_wait_seconds
+
+# Requests and tokens per minute by model, from LLM_RATE_LIMITS (JSON), e.g.
+# {"gpt-4o": {"rpm": 5000, "tpm": 800000}}. Set them to the account's tier
+# limits; models not listed (all of them by default) are not governed.
+RATE_LIMITS = json.loads(os.getenv('LLM_RATE_LIMITS') or '{}')
+LLM_RATE_MAX_WAIT_SECONDS = float(os.getenv('LLM_RATE_MAX_WAIT_SECONDS', 300))
+
+# Longest sleep between bucket checks, so penalties and refunds from other
+# processes are noticed
+POLL_SECONDS = 1.0
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited LLM_RATE_MAX_WAIT_SECONDS without getting budget."""
+
+
+def model_limits(model):
+    """
+    Bucket name and limits governing ``model``.
+
+    Returns:
+        tuple: (bucket key, {'rpm': ..., 'tpm': ...}), or (None, None) when ungoverned.
+    """
+    if model in RATE_LIMITS:
+        return model, RATE_LIMITS[model]
+    # Dated snapshots (gpt-4o-2024-08-06) share their base model's budget
+    base = next((name for name in RATE_LIMITS if model and model.startswith(name + '-')), None)
+    return (base, RATE_LIMITS[base]) if base else (None, None)
+
+
+def estimate_tokens(kwargs):
+    """Upper-bound token estimate of a request: prompt size plus the completion cap."""
+    prompt = kwargs.get('messages') or kwargs.get('input') or ''
+    prompt_tokens = len(prompt if isinstance(prompt, str) else json.dumps(prompt)) // 4
+    completion_cap = kwargs.get('max_tokens') or kwargs.get('max_output_tokens') or 1000
+    return prompt_tokens + completion_cap
+
+
+def _bucket_insert(key, limits, now):
+    values = {'model': key, 'requests': limits['rpm'], 'tokens': limits['tpm'], 'updated_at': now, 'version': 0}
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(LLMRateBucket).values(**values).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(LLMRateBucket).values(**values).on_conflict_do_nothing()
+    return insert(LLMRateBucket).values(**values)
+
+
+def _try_take(key, limits, tokens):
+    """
+    Take one request and ``tokens`` tokens from the bucket if available.
+
+    Returns:
+        float: 0 when taken, otherwise seconds until the budget should suffice.
+    """
+    rpm, tpm = limits['rpm'], limits['tpm']
+    now = time.time()
+    with db.engine.begin() as conn:
+        row = conn.execute(
+            select(LLMRateBucket.requests, LLMRateBucket.tokens, LLMRateBucket.updated_at, LLMRateBucket.version)
+            .where(LLMRateBucket.model == key)
+        ).first()
+        if row is None:
+            try:
+                conn.execute(_bucket_insert(key, limits, now))
+            except IntegrityError:
+                pass
+            return POLL_SECONDS / 100  # re-read the (now existing) bucket
+
+        elapsed = max(now - row.updated_at, 0.0)
+        requests = min(rpm, row.requests + elapsed * rpm / 60)
+        available = min(tpm, row.tokens + elapsed * tpm / 60)
+        if requests < 1 or available < tokens:
+            return max(
+                (1 - requests) * 60 / rpm if requests < 1 else 0.0,
+                (tokens - available) * 60 / tpm if available < tokens else 0.0,
+            )
+
+        taken = conn.execute(
+            update(LLMRateBucket)
+            .where(LLMRateBucket.model == key, LLMRateBucket.version == row.version)
+            .values(requests=requests - 1, tokens=available - tokens, updated_at=now, version=row.version + 1)
+        )
+        # Another process changed the bucket in between; look again
+        return 0.0 if taken.rowcount == 1 else POLL_SECONDS / 100
+
+
+def _adjust(key, requests=None, tokens=0.0):
+    with db.engine.begin() as conn:
+        values = {'tokens': LLMRateBucket.tokens + tokens, 'version': LLMRateBucket.version + 1}
+        if requests is not None:
+            values['requests'] = requests
+            values['updated_at'] = time.time()
+        conn.execute(update(LLMRateBucket).where(LLMRateBucket.model == key).values(**values))
+
+
+def acquire(model, tokens):
+    """
+    Wait for budget to send one request of about ``tokens`` tokens to ``model``.
+
+    Returns:
+        tuple: (reservation for settle(), seconds waited); the reservation is
+        None when the model is not governed.
+    """
+    key, limits = model_limits(model)
+    if not limits or not has_app_context():
+        return None, 0.0
+
+    tokens = min(tokens, limits['tpm'])
+    with _queues_lock:
+        queue = _queues.setdefault(key, (threading.Condition(), deque()))
+    condition, waiting = queue
+
+    started = time.monotonic()
+    deadline = started + LLM_RATE_MAX_WAIT_SECONDS
+    ticket = object()
+    with condition:
+        waiting.append(ticket)
+        llm_rate_queue_depth.inc(key)
+    try:
+        with condition:
+            while waiting[0] is not ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitTimeout(f"Waited {LLM_RATE_MAX_WAIT_SECONDS:.0f}s for {key} rate budget")
+                condition.wait(remaining)
+
+        while True:
+            try:
+                wait = _try_take(key, limits, tokens)
+            except Exception as e:
+                # Without the shared bucket (e.g. DB unavailable) calls go through ungoverned
+                print(f"Rate governor error ({key}): {e}")
+                return None, time.monotonic() - started
+            if wait == 0:
+                break
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Waited {LLM_RATE_MAX_WAIT_SECONDS:.0f}s for {key} rate budget")
+            time.sleep(min(wait, POLL_SECONDS))
+    finally:
+        with condition:
+            waiting.remove(ticket)
+            llm_rate_queue_depth.dec(key)
+            condition.notify_all()
+
+    waited = time.monotonic() - started
+    llm_rate_wait_seconds.observe(waited, key)
+    return (key, tokens), waited
+
+
+def waiting_callers():
+    """Number of callers in this process currently queued for rate budget, over all models."""
+    with _queues_lock:
+        queues = list(_queues.values())
+    return sum(len(waiting) for _, waiting in queues)
+
+
+def settle(reservation, actual_tokens):
+    """Return (or charge) the difference between the estimate and the tokens actually used."""
+    if reservation is None or actual_tokens is None:
+        return
+    key, reserved = reservation
+    if reserved != actual_tokens:
+        try:
+            _adjust(key, tokens=reserved - actual_tokens)
+        except Exception as e:
+            print(f"Rate governor settle error ({key}): {e}")
+
+
+def penalize(model, retry_after=None):
+    """After a 429, hold every process back until ``retry_after`` seconds have passed."""
+    key, limits = model_limits(model)
+    if not limits or not has_app_context():
+        return
+    llm_rate_limited_total.inc(key)
+    delay = retry_after if retry_after is not None else 60 / limits['rpm']
+    try:
+        _adjust(key, requests=-delay * limits['rpm'] / 60)
+    except Exception as e:
+        print(f"Rate governor penalty error ({key}): {e}")
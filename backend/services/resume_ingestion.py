@@ -0,0 +1,158 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import ResumeIngestion, Student, db
+from services.llm_ledger import llm_attribution
+from services.resume_store import get_parsed_resume, get_resume_text
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = {}  # student_id -> Future of the latest ingestion
+_inflight_lock = threading.Lock()
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('RESUME_INGESTION_WORKERS', 2),
+                    thread_name_prefix='resume-ingestion',
+                )
+    return _executor
+
+
+def normalize_skills(skills):
+    """Trim, collapse whitespace and de-duplicate skills case-insensitively."""
+    normalized = []
+    seen = set()
+    for skill in skills or []:
+        if not isinstance(skill, str):
+            continue
+        cleaned = " ".join(skill.split()).strip(" ,;.")
+        key = cleaned.lower()
+        if cleaned and key not in seen:
+            seen.add(key)
+            normalized.append(cleaned)
+    return normalized
+
+
+def _ingest(app, ingestion_id):
+    with app.app_context():
+        ingestion = db.session.get(ResumeIngestion, ingestion_id)
+        if ingestion is None:
+            return
+
+        ingestion.status = 'running'
+        ingestion.started_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            resume_text = get_resume_text(ingestion.student_id, ingestion.resume_path)
+            if not resume_text:
+                raise ValueError('Could not read resume')
+
+            with llm_attribution(student_id=ingestion.student_id):
+                parsed_resume = get_parsed_resume(
+                    ingestion.student_id, ingestion.resume_path, resume_text
+                )
+            if not parsed_resume:
+                raise ValueError('Could not parse resume')
+
+            # Skills of the replaced resume make way for the new resume's;
+            # skills the student entered by hand are kept
+            student = db.session.get(Student, ingestion.student_id)
+            previous = {skill.lower() for skill in student.resume_skills or []}
+            manual_skills = normalize_skills(
+                [skill for skill in student.skills or [] if skill.lower() not in previous]
+            )
+            manual = {skill.lower() for skill in manual_skills}
+            resume_skills = [
+                skill for skill in normalize_skills(parsed_resume.get('skills'))
+                if skill.lower() not in manual
+            ]
+            student.skills = manual_skills + resume_skills
+            student.resume_skills = resume_skills
+
+            ingestion.status = 'completed'
+            ingestion.error = None
+        except Exception as e:
+            db.session.rollback()
+            print(f"Resume ingestion error: {e}")
+            ingestion = db.session.get(ResumeIngestion, ingestion_id)
+            ingestion.status = 'failed'
+            ingestion.error = str(e)
+
+        ingestion.completed_at = datetime.utcnow()
+        db.session.commit()
+
+
+def enqueue_resume_ingestion(student):
+    """
+    Record an ingestion for the student's current resume and process it on
+    the background worker pool.
+
+    Returns:
+        ResumeIngestion: the newly created (pending) ingestion record.
+    """
+    ingestion = ResumeIngestion(
+        student_id=student.id,
+        resume_path=student.resume_path,
+        status='pending',
+    )
+    db.session.add(ingestion)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    future = _get_executor().submit(_ingest, app, ingestion.id)
+    with _inflight_lock:
+        _inflight[student.id] = future
+    future.add_done_callback(lambda f, sid=student.id: _forget(sid, f))
+
+    return ingestion
+
+
+def _forget(student_id, future):
+    with _inflight_lock:
+        if _inflight.get(student_id) is future:
+            del _inflight[student_id]
+
+
+def wait_for_resume_ingestion(student_id, timeout=None):
+    """
+    Block until any in-flight ingestion for the student has finished, so the
+    caller reads the stored parse instead of parsing the resume again.
+    """
+    if timeout is None:
+        timeout = current_app.config.get('RESUME_INGESTION_WAIT_SECONDS', 120)
+
+    with _inflight_lock:
+        future = _inflight.get(student_id)
+    if future is not None:
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pass
+        return
+
+    # The ingestion may be running in another worker process. Rows older than
+    # the wait window are treated as abandoned.
+    window_start = datetime.utcnow() - timedelta(seconds=timeout)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        active = ResumeIngestion.query.filter(
+            ResumeIngestion.student_id == student_id,
+            ResumeIngestion.status.in_(ACTIVE_STATUSES),
+            ResumeIngestion.created_at >= window_start,
+        ).first()
+        if active is None:
+            return
+        db.session.expire_all()
+        time.sleep(0.5)
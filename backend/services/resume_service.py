@@ -5,11 +5,14 @@ from io import BytesIO
 from textwrap import wrap
 
 import PyPDF2
-import openai
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
+from services.ats_engine import score_resume
+from services.openai_client import create_chat_completion
+from utils.metrics import track_stage
+
 
 def _parse_openai_json(response):
     """Normalize OpenAI response objects (client or raw dict) into JSON."""
@@ -72,10 +75,9 @@ def extract_resume_text(file_path):
         print(f"Resume extraction error: {e}")
         return None
 
+@track_stage('parse_resume_with_ai')
 def parse_resume_with_ai(resume_text):
     """Parse resume using AI to extract structured data"""
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
     base_prompt = (
         "You are a meticulous resume parsing assistant. Extract only verifiable facts from the resume. "
         "Return a JSON object matching the required structure with arrays where appropriate. "
@@ -122,7 +124,8 @@ Required JSON structure:
 
     # Use Chat Completions API with GPT-4o (supports JSON mode)
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "parse_resume_with_ai",
             model="gpt-4o",
             messages=[
                 {
@@ -140,10 +143,9 @@ Required JSON structure:
         print(f"Resume parsing error: {error}")
         return None
 
+@track_stage('calculate_match_score')
 def calculate_match_score(student_resume, job_analysis, company_research):
     """Calculate how well student matches the job"""
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
     prompt = f"""Analyze the fit between this candidate and job:
 
 Candidate Profile:
@@ -179,7 +181,8 @@ Provide analysis in JSON:
 Score should be 0-100."""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "calculate_match_score",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a career counselor analyzing candidate-job fit for college placements."},
@@ -201,58 +204,59 @@ Score should be 0-100."""
         print(f"Match calculation error: {e}")
         return None
 
-def calculate_ats_score(resume_text, job_keywords):
-    """Calculate ATS (Applicant Tracking System) compatibility score"""
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
-    prompt = f"""Analyze this resume for ATS (Applicant Tracking System) compatibility:
+def calculate_ats_score(resume_text, job_keywords, explain=False):
+    """
+    Calculate ATS (Applicant Tracking System) compatibility score.
+
+    Scoring is done locally by services.ats_engine; with ``explain=True`` an
+    LLM additionally reviews the result and adds tailored suggestions.
+    """
+    ats_analysis = score_resume(resume_text, job_keywords)
+    if explain:
+        explanation = explain_ats_score(resume_text, ats_analysis)
+        if explanation:
+            ats_analysis["suggestions"] = explanation.get("suggestions") or ats_analysis["suggestions"]
+            ats_analysis["explanation"] = explanation.get("explanation")
+    return ats_analysis
+
+@track_stage('explain_ats_score')
+def explain_ats_score(resume_text, ats_analysis):
+    """Ask the LLM to explain a locally computed ATS analysis"""
+    prompt = f"""An ATS scan of this resume produced the analysis below.
 
 Resume:
 {resume_text}
 
-Target Keywords:
-{json.dumps(job_keywords, indent=2)}
+ATS Analysis:
+{json.dumps(ats_analysis, indent=2)}
 
-Provide ATS analysis in JSON:
+Explain the result to the candidate and suggest concrete edits in JSON:
 {{
-    "ats_score": 85,
-    "keyword_match_percentage": 75,
-    "matched_keywords": ["keyword1", "keyword2"],
-    "missing_keywords": ["keyword3", "keyword4"],
-    "formatting_issues": ["issue1", "issue2"],
+    "explanation": "2-3 sentences on what drives the score",
     "suggestions": [
-        "Add more keywords from job description",
-        "Use standard section headings",
-        "Avoid tables and complex formatting"
-    ],
-    "overall_assessment": "Good / Fair / Poor"
-}}
-
-Score should be 0-100."""
+        "Specific, truthful edit that would add a missing keyword or fix a formatting issue"
+    ]
+}}"""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "explain_ats_score",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an ATS (Applicant Tracking System) analyzer helping candidates optimize their resumes."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=1500,
-            temperature=0.3
+            max_tokens=1000,
+            temperature=0.3,
+            response_format={"type": "json_object"},
         )
-
-        response_text = response.choices[0].message.content
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-
-        return json.loads(response_text)
+        return _parse_openai_json(response)
 
     except Exception as e:
-        print(f"ATS scoring error: {e}")
+        print(f"ATS explanation error: {e}")
         return None
 
+@track_stage('personalize_resume')
 def personalize_resume(
     student_resume,
     job_analysis,
@@ -261,8 +265,6 @@ def personalize_resume(
     skills_gap=None,
 ):
     """Generate structured personalized resume content ready for templating."""
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     prompt = f"""Create a personalized resume content package for this job application.
 
 Original Resume Data (authoritative facts only):
@@ -336,7 +338,8 @@ Return strict JSON with this schema:
 Respond with valid JSON only."""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "personalize_resume",
             model="gpt-4o",
             messages=[
                 {
@@ -363,10 +366,9 @@ Respond with valid JSON only."""
         print(f"Resume personalization error: {e}")
         return None
 
+@track_stage('identify_skills_gap')
 def identify_skills_gap(student_skills, required_skills, preferred_skills):
     """Identify skills gap and provide learning recommendations"""
-    client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
     prompt = f"""Analyze skills gap and provide learning recommendations:
 
 Student's Current Skills:
@@ -399,7 +401,8 @@ Provide analysis:
 }}"""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "identify_skills_gap",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a career development advisor helping students identify skill gaps and create learning plans."},
@@ -551,7 +554,6 @@ def generate_personalized_resume_pdf(student, drive, personalized_content, file_
 
     # Helper to draw section heading
     def draw_section(title, current_y):
-        nonlocal pdf
         if current_y <= margin + 40:
             pdf.showPage()
             current_y = height - margin
@@ -0,0 +1,102 @@
+import hashlib
+
+from sqlalchemy.exc import IntegrityError
+
+from models import ParsedResume, db
+from services.ats_engine import canonical_tokens
+from services.resume_service import extract_resume_text, parse_resume_with_ai
+
+
+def compute_resume_hash(file_path):
+    """Return the SHA-256 hex digest of a resume file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_entry(content_hash):
+    return ParsedResume.query.filter_by(content_hash=content_hash).first()
+
+
+def _save_entry(content_hash, student_id, **fields):
+    """Create or update the store entry for a resume hash."""
+    entry = _get_entry(content_hash)
+    if entry is None:
+        entry = ParsedResume(content_hash=content_hash, student_id=student_id)
+        db.session.add(entry)
+    for key, value in fields.items():
+        setattr(entry, key, value)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request stored the same resume first; keep its entry.
+        db.session.rollback()
+        entry = _get_entry(content_hash)
+    return entry
+
+
+def get_resume_text(student_id, file_path):
+    """Return the extracted text of a resume, extracting it only once per file content."""
+    try:
+        content_hash = compute_resume_hash(file_path)
+    except OSError as e:
+        print(f"Resume hash error: {e}")
+        return None
+
+    entry = _get_entry(content_hash)
+    if entry and entry.resume_text:
+        return entry.resume_text
+
+    resume_text = extract_resume_text(file_path)
+    if resume_text:
+        _save_entry(
+            content_hash,
+            student_id,
+            resume_text=resume_text,
+            canonical_text=" ".join(canonical_tokens(resume_text)),
+        )
+    return resume_text
+
+
+def get_parsed_resume(student_id, file_path, resume_text):
+    """Return the structured parse of a resume, calling the AI only on a store miss."""
+    try:
+        content_hash = compute_resume_hash(file_path)
+    except OSError as e:
+        print(f"Resume hash error: {e}")
+        return None
+
+    entry = _get_entry(content_hash)
+    if entry and entry.parsed_data:
+        return entry.parsed_data
+
+    parsed_resume = parse_resume_with_ai(resume_text)
+    if parsed_resume:
+        _save_entry(
+            content_hash,
+            student_id,
+            resume_text=resume_text,
+            parsed_data=parsed_resume,
+        )
+    return parsed_resume
+
+
+def load_parsed_resume(student_id, file_path):
+    """
+    Convenience wrapper returning both the resume text and its structured parse.
+
+    Returns:
+        tuple: (resume_text, parsed_resume); either may be None on failure.
+    """
+    resume_text = get_resume_text(student_id, file_path)
+    if not resume_text:
+        return None, None
+    return resume_text, get_parsed_resume(student_id, file_path, resume_text)
+
+
+def invalidate_parsed_resumes(student_id):
+    """Drop stored parses for a student. Called when a new resume is uploaded."""
+    ParsedResume.query.filter_by(student_id=student_id).delete(synchronize_session=False)
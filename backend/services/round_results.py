@@ -0,0 +1,172 @@
+"""
+Bulk ingestion of selection-round results.
+
+Results arrive as JSON ({"results": [...]}) or CSV with the columns
+application_id, status and feedback. A whole upload is validated against the
+round's drive with one query and written with one INSERT ... ON CONFLICT
+(application_id, round_id) DO UPDATE statement executed for all rows.
+Candidate notifications are handed to the background email sender after the
+commit.
+"""
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Application, RoundResult, Student, User, db
+
+RESULT_STATUSES = ('selected', 'rejected', 'pending')
+
+
+class RoundResultsError(ValueError):
+    """The uploaded results cannot be processed as a whole."""
+
+
+def parse_results_csv(text):
+    """Read result rows from CSV text with an application_id,status[,feedback] header."""
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {name.strip().lower() for name in (reader.fieldnames or []) if name}
+    if not {'application_id', 'status'} <= fields:
+        raise RoundResultsError('CSV must have application_id and status columns')
+
+    rows = []
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        if any(row.values()):
+            rows.append(row)
+    return rows
+
+
+def normalize_results(rows):
+    """
+    Validate result rows.
+
+    Returns:
+        tuple: (results keyed by application_id, list of row errors). When an
+        application appears more than once the last row wins.
+    """
+    results = {}
+    errors = []
+    for line, row in enumerate(rows, start=1):
+        try:
+            application_id = int(row.get('application_id'))
+        except (TypeError, ValueError):
+            errors.append({'row': line, 'error': 'application_id must be an integer'})
+            continue
+
+        status = str(row.get('status') or '').strip().lower()
+        if status not in RESULT_STATUSES:
+            errors.append({'row': line, 'application_id': application_id,
+                           'error': f"status must be one of: {', '.join(RESULT_STATUSES)}"})
+            continue
+
+        results[application_id] = {
+            'application_id': application_id,
+            'status': status,
+            'feedback': row.get('feedback') or None,
+        }
+    return results, errors
+
+
+def _upsert_statement():
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        return None
+
+    statement = insert(RoundResult.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=['application_id', 'round_id'],
+        set_={
+            'status': statement.excluded.status,
+            'feedback': statement.excluded.feedback,
+            'updated_at': statement.excluded.updated_at,
+        },
+    )
+
+
+def _upsert_fallback(rows, round_id):
+    """Portable upsert for databases without ON CONFLICT: one read, bulk writes."""
+    existing = dict(
+        db.session.query(RoundResult.application_id, RoundResult.id).filter(
+            RoundResult.round_id == round_id,
+            RoundResult.application_id.in_([row['application_id'] for row in rows]),
+        )
+    )
+    updates = [dict(row, id=existing[row['application_id']]) for row in rows if row['application_id'] in existing]
+    inserts = [row for row in rows if row['application_id'] not in existing]
+    if updates:
+        db.session.bulk_update_mappings(RoundResult, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(RoundResult, inserts)
+
+
+def upsert_round_results(selection_round, rows, chunk_size=1000):
+    """
+    Validate and store a batch of results for one round.
+
+    Args:
+        selection_round (SelectionRound): round the results belong to.
+        rows (list): dicts with application_id, status and feedback.
+
+    Returns:
+        dict: summary with processed/rejected counts, row errors and the
+        notification messages (to, subject, body) to send after commit.
+    """
+    results, errors = normalize_results(rows)
+    if not results and not errors:
+        raise RoundResultsError('No results provided')
+
+    # One query for every affected application, restricted to the round's drive
+    applications = {
+        application_id: email
+        for application_id, email in db.session.query(Application.id, User.email)
+        .join(Student, Application.student_id == Student.id)
+        .outerjoin(User, Student.user_id == User.id)
+        .filter(
+            Application.drive_id == selection_round.drive_id,
+            Application.id.in_(list(results)),
+        )
+    }
+    for application_id in [application_id for application_id in results if application_id not in applications]:
+        errors.append({'application_id': application_id, 'error': 'Application not found for this drive'})
+        del results[application_id]
+
+    now = datetime.utcnow()
+    values = [dict(result, round_id=selection_round.id, updated_at=now) for result in results.values()]
+    statement = _upsert_statement()
+    if statement is None:
+        for offset in range(0, len(values), chunk_size):
+            _upsert_fallback(values[offset:offset + chunk_size], selection_round.id)
+    elif values:
+        # executemany; SQLAlchemy batches the rows into multi-row statements
+        db.session.execute(statement, values)
+
+    rejected = [result['application_id'] for result in results.values() if result['status'] == 'rejected']
+    for offset in range(0, len(rejected), chunk_size):
+        db.session.execute(
+            update(Application)
+            .where(Application.id.in_(rejected[offset:offset + chunk_size]))
+            .values(status='rejected')
+        )
+
+    notifications = [
+        (
+            applications[result['application_id']],
+            f"Round Update - {result['status'].title()}",
+            f"Your status for round {selection_round.id}: {result['status']}",
+        )
+        for result in results.values()
+    ]
+
+    return {
+        'processed': len(results),
+        'rejected_applications': len(rejected),
+        'errors': errors,
+        'notifications': notifications,
+    }
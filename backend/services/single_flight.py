@@ -0,0 +1,162 @@
+"""
+Single-flight coalescing: run an expensive operation once per key while
+concurrent callers wait for it and share the result.
+
+Threads of one process wait on an in-process future. Across worker
+processes the first caller takes a lease row in single_flight_locks; callers
+in other processes poll that row and read the leader's (JSON) result from it
+once it is done. A finished result is also handed to callers that arrive
+within RESULT_TTL_SECONDS, and a lease that runs out (the leader died) can
+be taken over. Lock rows are written on a connection of their own, so the
+caller's session is never committed.
+"""
+import copy
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import SingleFlightLock, db
+
+RESULT_TTL_SECONDS = 300
+POLL_SECONDS = 1.0
+
+_inflight = {}  # key -> Future of this process's leader
+_inflight_lock = threading.Lock()
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when a caller gave up waiting for another process's flight."""
+
+
+def _lock_insert(values):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(SingleFlightLock).values(**values).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(SingleFlightLock).values(**values).on_conflict_do_nothing()
+    return insert(SingleFlightLock).values(**values)
+
+
+def _claim(key, owner, lease_seconds):
+    """
+    Try to lead the flight for ``key``.
+
+    Returns:
+        tuple: ('leader', None), ('done', result) or ('wait', None)
+    """
+    now = datetime.utcnow()
+    lease = {
+        'owner': owner,
+        'status': 'running',
+        'result': None,
+        'expires_at': now + timedelta(seconds=lease_seconds),
+        'finished_at': None,
+    }
+    with db.engine.begin() as conn:
+        row = conn.execute(
+            select(SingleFlightLock.status, SingleFlightLock.result, SingleFlightLock.expires_at,
+                   SingleFlightLock.finished_at, SingleFlightLock.version)
+            .where(SingleFlightLock.key == key)
+        ).first()
+        if row is None:
+            try:
+                claimed = conn.execute(_lock_insert(dict(lease, key=key, version=0)))
+            except IntegrityError:
+                return 'wait', None
+            return ('leader', None) if claimed.rowcount == 1 else ('wait', None)
+
+        if row.status == 'done' and row.finished_at >= now - timedelta(seconds=RESULT_TTL_SECONDS):
+            return 'done', row.result
+        if row.status == 'running' and row.expires_at > now:
+            return 'wait', None
+
+        # Stale result, failed flight or abandoned lease: take it over
+        claimed = conn.execute(
+            update(SingleFlightLock)
+            .where(SingleFlightLock.key == key, SingleFlightLock.version == row.version)
+            .values(version=row.version + 1, **lease)
+        )
+        return ('leader', None) if claimed.rowcount == 1 else ('wait', None)
+
+
+def _finish(key, owner, status, result=None):
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(SingleFlightLock)
+                .where(SingleFlightLock.key == key, SingleFlightLock.owner == owner)
+                .values(
+                    status=status,
+                    result=result,
+                    finished_at=datetime.utcnow(),
+                    version=SingleFlightLock.version + 1,
+                )
+            )
+    except Exception as e:
+        # Waiting processes take over once the lease expires
+        print(f"Single-flight finish error ({key}): {e}")
+
+
+def _run_across_processes(key, fn, lease_seconds, wait_seconds):
+    owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        try:
+            state, result = _claim(key, owner, lease_seconds)
+        except Exception as e:
+            # Without the lock table, coalesce within this process only
+            print(f"Single-flight lock error ({key}): {e}")
+            return fn()
+        if state == 'done':
+            return result
+        if state == 'leader':
+            break
+        if time.monotonic() >= deadline:
+            raise SingleFlightTimeout(f"Gave up waiting for {key}")
+        time.sleep(POLL_SECONDS)
+
+    try:
+        result = fn()
+    except Exception:
+        _finish(key, owner, 'failed')
+        raise
+    _finish(key, owner, 'done', result)
+    return result
+
+
+def single_flight(key, fn, lease_seconds=900, wait_seconds=900):
+    """
+    Return ``fn()``, running it at most once at a time per ``key`` across
+    threads and processes; callers that arrive meanwhile get the same result.
+
+    ``fn`` must return a JSON-serializable value. ``lease_seconds`` should
+    exceed its longest run so a live leader is not taken over.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        # Each caller gets its own copy to modify
+        return copy.deepcopy(future.result(timeout=wait_seconds))
+
+    try:
+        result = _run_across_processes(key, fn, lease_seconds, wait_seconds)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return copy.deepcopy(result)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
@@ -0,0 +1,150 @@
+"""
+Per-user auth context (role, profile id, department) without DB round-trips.
+
+Login embeds the context in the access token as additional claims. Requests
+read it from the token, falling back to the database only for tokens issued
+before the claims existed. The resolved context is kept in an in-process
+TTL/LRU cache and on flask.g for the rest of the request. No route changes a
+user's role, profile or department after registration, so neither the claims
+nor the cache need invalidating.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from flask import abort, current_app, g, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+
+from models import HOD, TPO, Student, User, db
+
+AuthContext = namedtuple('AuthContext', ['user_id', 'role', 'profile_id', 'department'])
+
+PROFILE_MODELS = {'student': Student, 'hod': HOD, 'tpo': TPO}
+
+# Scope of the short-lived tokens that EventSource sends as ?jwt=
+STREAM_SCOPE = 'analysis_stream'
+STREAM_ENDPOINT = 'ai.stream_analysis_job'
+
+
+class _ContextCache:
+    """LRU of auth contexts that also expires entries after a TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            context, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return context
+
+    def put(self, user_id, context, ttl, max_entries):
+        with self._lock:
+            self._entries[user_id] = (context, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+_contexts = _ContextCache()
+
+
+def auth_claims(user, profile):
+    """Additional JWT claims describing the user's role and profile."""
+    return {
+        'role': user.role,
+        'profile_id': profile.id if profile else None,
+        'department': getattr(profile, 'department', None),
+    }
+
+
+def load_profile(user):
+    model = PROFILE_MODELS.get(user.role)
+    return model.query.filter_by(user_id=user.id).first() if model else None
+
+
+def _load_context(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    claims = auth_claims(user, load_profile(user))
+    return AuthContext(user_id, claims['role'], claims['profile_id'], claims['department'])
+
+
+def get_auth_context():
+    """
+    Auth context of the current request's user (requires a verified JWT).
+
+    Returns:
+        AuthContext: or None if the user no longer exists.
+    """
+    if 'auth_context' in g:
+        return g.auth_context
+
+    user_id = int(get_jwt_identity())
+    context = _contexts.get(user_id)
+    if context is None:
+        claims = get_jwt()
+        if 'role' in claims:
+            context = AuthContext(user_id, claims['role'], claims.get('profile_id'), claims.get('department'))
+        else:
+            context = _load_context(user_id)
+        if context is not None:
+            _contexts.put(
+                user_id,
+                context,
+                current_app.config['AUTH_CONTEXT_TTL_SECONDS'],
+                current_app.config['AUTH_CONTEXT_CACHE_SIZE'],
+            )
+
+    g.auth_context = context
+    return context
+
+
+def current_profile_id():
+    """Profile id (Student/HOD/TPO) of the current user, or 404 when there is none."""
+    context = get_auth_context()
+    if context is None or context.profile_id is None:
+        abort(404)
+    return context.profile_id
+
+
+def current_student():
+    """The current user's Student row, loaded by primary key."""
+    return Student.query.get_or_404(current_profile_id())
+
+
+def create_stream_token(job_id):
+    """Short-lived token authorizing only the progress stream of one analysis job."""
+    context = get_auth_context()
+    return create_access_token(
+        identity=str(context.user_id),
+        additional_claims={
+            'role': context.role,
+            'profile_id': context.profile_id,
+            'department': context.department,
+            'scope': STREAM_SCOPE,
+            'job_id': job_id,
+        },
+        expires_delta=timedelta(seconds=current_app.config['ANALYSIS_STREAM_TOKEN_SECONDS']),
+    )
+
+
+def token_scope_allowed(jwt_header, jwt_data):
+    """
+    JWT verification hook: stream tokens are only valid on their own job's
+    stream, and the stream (which reads its token from the URL) accepts
+    nothing else, so regular access tokens never travel in a query string.
+    """
+    on_stream = request.endpoint == STREAM_ENDPOINT
+    if jwt_data.get('scope') != STREAM_SCOPE:
+        return not on_stream
+    return on_stream and (request.view_args or {}).get('job_id') == jwt_data.get('job_id')
@@ -0,0 +1,242 @@
+"""
+In-process Prometheus metrics served as text from /metrics.
+
+Counters, gauges and histograms are plain dicts of label values guarded by a
+lock, so recording a sample costs a dict lookup and a few additions. Values
+are per process: with several worker processes, scrape each one (or run a
+single process per scrape target).
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        return [
+            f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def _samples(self):
+        lines = []
+        for labels, (counts, total, value_sum) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            le = _format_labels(self.label_names, labels, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{le} {total}')
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_count{plain} {total}')
+            lines.append(f'{self.name}_sum{plain} {_format_value(value_sum)}')
+        return lines
+
+
+http_requests_total = Counter(
+    'http_requests_total', 'HTTP requests by route and status.', ['method', 'route', 'status'])
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route.', ['method', 'route'])
+http_requests_in_flight = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served.')
+db_queries_per_request = Histogram(
+    'db_queries_per_request', 'Database queries issued per HTTP request.', ['route'],
+    buckets=QUERY_COUNT_BUCKETS)
+db_query_seconds_per_request = Histogram(
+    'db_query_seconds_per_request', 'Time spent in database queries per HTTP request.', ['route'])
+ai_stage_duration = Histogram(
+    'ai_stage_duration_seconds', 'Latency of AI stage calls.', ['stage'], buckets=STAGE_BUCKETS)
+ai_stage_calls_total = Counter(
+    'ai_stage_calls_total', 'AI stage calls.', ['stage'])
+ai_stage_errors_total = Counter(
+    'ai_stage_errors_total', 'AI stage calls that raised or returned no result.', ['stage'])
+analysis_stage_duration = Histogram(
+    'analysis_stage_duration_seconds', 'Latency of job-fit pipeline stages.', ['stage'],
+    buckets=STAGE_BUCKETS)
+
+llm_rate_queue_depth = Gauge(
+    'llm_rate_queue_depth', 'Callers waiting for LLM rate budget.', ['model'])
+llm_rate_wait_seconds = Histogram(
+    'llm_rate_wait_seconds', 'Time callers waited for LLM rate budget.', ['model'],
+    buckets=STAGE_BUCKETS)
+llm_rate_limited_total = Counter(
+    'llm_rate_limited_total', 'Rate limit (429) responses from the LLM provider.', ['model'])
+llm_cache_requests_total = Counter(
+    'llm_cache_requests_total', 'LLM response cache lookups by result (memory_hit, disk_hit, miss).',
+    ['stage', 'result'])
+company_stale_served_total = Counter(
+    'company_research_stale_served_total', 'Stale company research served while a refresh was queued.')
+company_refresh_queue_depth = Gauge(
+    'company_research_refresh_queue_depth', 'Companies waiting for a background research refresh.')
+company_refreshes_total = Counter(
+    'company_research_refreshes_total', 'Background company research refreshes by trigger (stale, scheduled).',
+    ['trigger'])
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def track_stage(stage):
+    """
+    Decorator recording latency, calls and errors of an AI stage.
+
+    A call counts as an error when it raises or returns None (the AI helpers
+    report failures by returning None).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = result is None
+                return result
+            finally:
+                ai_stage_duration.observe(time.perf_counter() - started, stage)
+                ai_stage_calls_total.inc(stage)
+                if failed:
+                    ai_stage_errors_total.inc(stage)
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and conn.info.get('query_started'):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        g.db_query_count = g.get('db_query_count', 0) + 1
+        g.db_query_seconds = g.get('db_query_seconds', 0.0) + elapsed
+
+
+def _route_label():
+    # Endpoint names (blueprint.view) keep the label set bounded, unlike raw paths
+    return request.endpoint or 'unmatched'
+
+
+def init_metrics(app):
+    """Register the request hooks and the /metrics endpoint on ``app``."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            route = _route_label()
+            http_requests_total.inc(request.method, route, str(response.status_code))
+            http_request_duration.observe(time.perf_counter() - started, request.method, route)
+            db_queries_per_request.observe(g.get('db_query_count', 0), route)
+            db_query_seconds_per_request.observe(g.get('db_query_seconds', 0.0), route)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop('metrics_started', None) is not None:
+            http_requests_in_flight.dec()
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,147 @@
+"""
+Keyset (cursor) pagination and query-string filters for list endpoints.
+
+A list endpoint declares the sort orders it supports as
+
+    {'newest': [(Application.applied_at, 'desc'), (Application.id, 'desc')]}
+
+ending with a unique column so that every row has a distinct position, and
+the filters it accepts as {param: (column, operator)}. Clients page with
+?limit=&sort=&cursor=; the next cursor is returned in the X-Next-Cursor
+response header and the body stays a plain JSON array. Each page is a
+single indexed range scan, so it costs the same however deep the client
+has paged.
+
+Sort keys must not be NULL; wrap nullable columns in coalesce().
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import jsonify
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class ListQueryError(Exception):
+    """Invalid pagination or filter parameters (reported as 400)."""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(sort, key):
+    payload = json.dumps({'s': sort, 'k': [_encode_value(value) for value in key]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, key_length):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = [_decode_value(value) for value in payload['k']]
+    except (ValueError, KeyError, TypeError):
+        raise ListQueryError('Invalid cursor')
+    if payload.get('s') != sort or len(key) != key_length:
+        raise ListQueryError('Cursor does not match the requested sort order')
+    return key
+
+
+def _parse_float(args, name):
+    value = args.get(name)
+    try:
+        return float(value)
+    except ValueError:
+        raise ListQueryError(f'{name} must be a number')
+
+
+def apply_filters(query, args, filters):
+    """
+    Apply the filters present in ``args`` to ``query``.
+
+    ``filters`` maps a query-string parameter to (column, operator), where the
+    operator is 'eq', 'in' (repeatable parameter), 'gte' or 'lte'.
+    """
+    for name, (column, operator) in filters.items():
+        if name not in args:
+            continue
+        if operator == 'in':
+            values = [value for value in args.getlist(name) if value]
+            if values:
+                query = query.filter(column.in_(values))
+        elif operator == 'gte':
+            query = query.filter(column >= _parse_float(args, name))
+        elif operator == 'lte':
+            query = query.filter(column <= _parse_float(args, name))
+        else:
+            query = query.filter(column == args.get(name))
+    return query
+
+
+def _after(columns, key):
+    """Predicate selecting rows that sort strictly after ``key``."""
+    clauses = []
+    for index, (column, direction) in enumerate(columns):
+        earlier_equal = [columns[i][0] == key[i] for i in range(index)]
+        beyond = column > key[index] if direction == 'asc' else column < key[index]
+        clauses.append(and_(*earlier_equal, beyond))
+    return or_(*clauses)
+
+
+def paginate(query, args, sort_orders, default_sort):
+    """
+    Return one page of ``query`` in the requested sort order.
+
+    Returns:
+        tuple: (items, next_cursor); next_cursor is None on the last page.
+    """
+    sort = args.get('sort', default_sort)
+    if sort not in sort_orders:
+        raise ListQueryError(f"sort must be one of: {', '.join(sort_orders)}")
+    columns = sort_orders[sort]
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ListQueryError('limit must be an integer')
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+    if args.get('cursor'):
+        query = query.filter(_after(columns, decode_cursor(args['cursor'], sort, len(columns))))
+
+    # The sort key travels with each row so the cursor can be built from the last one
+    key_count = len(columns)
+    query = query.add_columns(*[column.label(f'_sort_key_{i}') for i, (column, _) in enumerate(columns)])
+    query = query.order_by(*[
+        column.asc() if direction == 'asc' else column.desc()
+        for column, direction in columns
+    ])
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, list(rows[-1][-key_count:]))
+
+    items = [row[0] if len(row) == key_count + 1 else tuple(row[:-key_count]) for row in rows]
+    return items, next_cursor
+
+
+def paginated_response(payload, next_cursor):
+    """JSON array response carrying the next-page cursor in a header."""
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    return response
@@ -0,0 +1,127 @@
+"""
+Structured (JSON lines) request logging through a non-blocking queue.
+
+Request threads only put records on an in-memory queue; a QueueListener
+thread formats them and writes to stdout. Successful requests are sampled at
+LOG_SAMPLE_RATE, while errors (status >= 400) and requests slower than
+LOG_SLOW_REQUEST_MS are always logged. Credentials are never written:
+Authorization/Cookie headers and the jwt query parameter are redacted.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, request
+
+logger = logging.getLogger('placement')
+
+REDACTED_HEADERS = {'authorization', 'cookie', 'proxy-authorization', 'x-api-key'}
+REDACTED_PARAMS = {'jwt', 'token', 'access_token'}
+# Client-supplied correlation ids outside this pattern are replaced
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from ``extra={'fields': {...}}``."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def redact_headers(headers):
+    return {
+        name: '[REDACTED]' if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def redact_args(args):
+    return {
+        name: '[REDACTED]' if name.lower() in REDACTED_PARAMS else values
+        for name, values in args.lists()
+    }
+
+
+def request_fields():
+    """Identifying fields of the current request for log records."""
+    context = g.get('auth_context')
+    return {
+        'request_id': g.get('request_id'),
+        'method': request.method,
+        'path': request.path,
+        'user_id': context.user_id if context else None,
+    }
+
+
+def configure_logging(app):
+    """Attach the queue-backed JSON logger and the request hooks to ``app``."""
+    global _listener
+    logger.setLevel(app.config['LOG_LEVEL'])
+    logger.propagate = False
+
+    if _listener is None:
+        log_queue = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    sample_rate = app.config['LOG_SAMPLE_RATE']
+    slow_ms = app.config['LOG_SLOW_REQUEST_MS']
+    skip_paths = set(app.config['LOG_SKIP_PATHS'])
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        request_id = request.headers.get('X-Request-ID', '')
+        g.request_id = request_id if REQUEST_ID_PATTERN.fullmatch(request_id) else uuid.uuid4().hex
+
+    @app.after_request
+    def log_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        latency_ms = (time.perf_counter() - started) * 1000
+        response.headers['X-Request-ID'] = g.request_id
+
+        always = response.status_code >= 400 or latency_ms >= slow_ms
+        if not always and (request.path in skip_paths or random.random() >= sample_rate):
+            return response
+
+        fields = request_fields()
+        fields.update({
+            'event': 'request',
+            'status': response.status_code,
+            'latency_ms': round(latency_ms, 2),
+            'remote_addr': request.remote_addr,
+            'args': redact_args(request.args),
+            'sampled': not always,
+        })
+        if always or logger.isEnabledFor(logging.DEBUG):
+            fields['headers'] = redact_headers(request.headers)
+
+        level = logging.ERROR if response.status_code >= 500 else \
+            logging.WARNING if always else logging.INFO
+        logger.log(level, f"{request.method} {request.path} {response.status_code}", extra={'fields': fields})
+        return response
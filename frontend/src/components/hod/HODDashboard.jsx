@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { hodAPI } from '../../services/api';
+import { fetchAllPages, hodAPI } from '../../services/api';
 import ModernNavbar from '../common/ModernNavbar';
 import ModernCard from '../common/ModernCard';
 import ModernButton from '../common/ModernButton';
@@ -17,11 +17,11 @@ const HODDashboard = () => {
 
   const loadData = async () => {
     try {
-      const [studentsRes, statsRes] = await Promise.all([
-        hodAPI.getPendingStudents(),
+      const [students, statsRes] = await Promise.all([
+        fetchAllPages(hodAPI.getPendingStudents),
         hodAPI.getStats(),
       ]);
-      setPendingStudents(studentsRes.data);
+      setPendingStudents(students);
       setStats(statsRes.data);
     } catch (error) {
       console.error('Failed to load data:', error);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { tpoAPI } from '../../services/api';
+import { fetchAllPages, tpoAPI } from '../../services/api';
 import ModernNavbar from '../common/ModernNavbar';
 import ModernCard from '../common/ModernCard';
 import ModernButton from '../common/ModernButton';
@@ -33,12 +33,12 @@ const TPODashboard = () => {
 
   const loadData = async () => {
     try {
-      const [drivesRes, companiesRes] = await Promise.all([
-        tpoAPI.getDrives(),
-        tpoAPI.getCompanies(),
+      const [allDrives, allCompanies] = await Promise.all([
+        fetchAllPages(tpoAPI.getDrives, { sort: 'newest' }),
+        fetchAllPages(tpoAPI.getCompanies),
       ]);
-      setDrives(drivesRes.data);
-      setCompanies(companiesRes.data);
+      setDrives(allDrives);
+      setCompanies(allCompanies);
     } catch (error) {
       console.error('Failed to load data:', error);
     }
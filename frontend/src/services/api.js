@@ -19,6 +19,18 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Follow the X-Next-Cursor header of a keyset-paginated list until its last page
+export const fetchAllPages = async (request, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await request({ ...params, limit: 200, ...(cursor && { cursor }) });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
 // Auth APIs
 export const authAPI = {
   register: (data) => api.post('/auth/register', data),
@@ -29,13 +41,20 @@ export const authAPI = {
 // TPO APIs
 export const tpoAPI = {
   createCompany: (data) => api.post('/tpo/companies', data),
-  getCompanies: () => api.get('/tpo/companies'),
+  getCompanies: (params) => api.get('/tpo/companies', { params }),
   createDrive: (data) => api.post('/tpo/drives', data),
-  getDrives: () => api.get('/tpo/drives'),
+  getDrives: (params) => api.get('/tpo/drives', { params }),
   getDriveDetails: (id) => api.get(`/tpo/drives/${id}`),
-  getDriveApplications: (id) => api.get(`/tpo/drives/${id}/applications`),
+  getDriveApplications: (id, params) => api.get(`/tpo/drives/${id}/applications`, { params }),
   createRound: (data) => api.post('/tpo/rounds', data),
   updateRoundResults: (id, data) => api.post(`/tpo/rounds/${id}/results`, data),
+  uploadRoundResults: (id, file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return api.post(`/tpo/rounds/${id}/results`, formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
   selectCandidate: (id) => api.post(`/tpo/applications/${id}/select`),
   uploadOfferLetter: (id, file) => {
     const formData = new FormData();
@@ -48,11 +67,11 @@ export const tpoAPI = {
 
 // HOD APIs
 export const hodAPI = {
-  getPendingStudents: () => api.get('/hod/students/pending'),
+  getPendingStudents: (params) => api.get('/hod/students/pending', { params }),
   approveStudent: (id) => api.post(`/hod/students/${id}/approve`),
   updateStudent: (id, data) => api.put(`/hod/students/${id}`, data),
   getStats: () => api.get('/hod/stats'),
-  getPlacementReport: () => api.get('/hod/reports/placements'),
+  getPlacementReport: (params) => api.get('/hod/reports/placements', { params }),
 };
 
 // Student APIs
@@ -67,7 +86,7 @@ export const studentAPI = {
     });
   },
   getAvailableDrives: () => api.get('/student/drives/available'),
-  getMyApplications: () => api.get('/student/applications'),
+  getMyApplications: (params) => api.get('/student/applications', { params }),
   downloadOfferLetter: (id) => api.get(`/student/applications/${id}/offer-letter`, {
     responseType: 'blob',
   }),